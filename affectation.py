@@ -0,0 +1,128 @@
+"""Affectation des chevaux aux cours d'une journée par coût minimal.
+
+Chaque cours d'un jour devient autant de places que de chevaux requis; la
+matrice cheval × place est calculée avec NumPy:
+
+    coût = palier de qualification ('Oui' 0, 'Dépannage' 1) × PALIER
+           + charge courante (heures)
+           + PENALITE_DEPASSEMENT × heures au-delà du maximum
+
+Les paires interdites (non qualifié, déjà occupé pendant le cours) valent
+INTERDIT. Un tour affecte toute la journée d'un coup, chaque cheval prenant
+au plus une place; les tours suivants complètent les places restantes avec
+les chevaux libres à ces heures, jamais sur deux cours qui se chevauchent.
+
+scipy (linear_sum_assignment, déclaré dans requirements.txt) résout chaque
+tour en code compilé: le mode optimal coûte alors à peu près le temps du
+mode glouton. Sans scipy, un algorithme hongrois en NumPy donne la même
+affectation optimale, mais sa boucle de chemins augmentants reste en Python:
+nettement plus lent au-delà de quelques centaines de chevaux.
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # scipy est optionnel
+    linear_sum_assignment = None
+
+# Un cheval 'Oui' passe avant un 'Dépannage' tant que l'écart de charge reste sous PALIER heures
+PALIER = 100.0
+PENALITE_DEPASSEMENT = 10.0
+INTERDIT = 1e9
+
+
+def _hongrois(cout):
+    """Affectation de coût minimal d'une matrice avec lignes <= colonnes (potentiels, chemins augmentants)"""
+    nb_lignes, nb_colonnes = cout.shape
+    u = np.zeros(nb_lignes + 1)
+    v = np.zeros(nb_colonnes + 1)
+    # p[j]: ligne (1..n) affectée à la colonne j, 0 si libre; la colonne 0 est fictive
+    p = np.zeros(nb_colonnes + 1, dtype=int)
+    chemin = np.zeros(nb_colonnes + 1, dtype=int)
+    # Départ glouton: u = minimum de chaque ligne (v = 0), chaque ligne prend une colonne libre
+    # de coût réduit nul. Les places d'un même cours ont des lignes identiques: la plupart
+    # sont affectées ici et seules les autres cherchent un chemin augmentant.
+    u[1:] = cout.min(axis=1)
+    serrees = cout - u[1:, None] <= 0
+    restantes = []
+    for i in range(1, nb_lignes + 1):
+        libres = np.flatnonzero(serrees[i - 1] & (p[1:] == 0))
+        if len(libres):
+            p[libres[0] + 1] = i
+        else:
+            restantes.append(i)
+    for i in restantes:
+        p[0] = i
+        j0 = 0
+        minv = np.full(nb_colonnes + 1, np.inf)
+        vues = np.zeros(nb_colonnes + 1, dtype=bool)
+        while p[j0] != 0:
+            vues[j0] = True
+            libres = ~vues[1:]
+            reduits = cout[p[j0] - 1] - u[p[j0]] - v[1:]
+            meilleurs = libres & (reduits < minv[1:])
+            minv[1:][meilleurs] = reduits[meilleurs]
+            chemin[1:][meilleurs] = j0
+            candidats = np.where(libres, minv[1:], np.inf)
+            j1 = int(np.argmin(candidats)) + 1
+            delta = candidats[j1 - 1]
+            u[p[vues]] += delta
+            v[vues] -= delta
+            minv[1:][libres] -= delta
+            j0 = j1
+        while j0 != 0:
+            j1 = chemin[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    colonnes = np.flatnonzero(p[1:])
+    lignes = p[1:][colonnes] - 1
+    ordre = np.argsort(lignes)
+    return lignes[ordre], colonnes[ordre]
+
+
+def resoudre_affectation(cout):
+    """Affectation de coût minimal d'une matrice rectangulaire: (lignes, colonnes) triées par ligne"""
+    if cout.shape[0] > cout.shape[1]:
+        colonnes, lignes = resoudre_affectation(cout.T)
+        ordre = np.argsort(lignes)
+        return lignes[ordre], colonnes[ordre]
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cout)
+    return _hongrois(cout)
+
+
+def affecter_places(niveaux, charge, maximum, occupe, debut, fin, durees, requis):
+    """Chevaux retenus pour chaque cours d'une journée (listes d'indices de chevaux).
+
+    niveaux: chevaux × cours, 0 'Oui', 1 'Dépannage', inf non qualifié
+    charge: heures déjà comptées par cheval; maximum: heures maximum (None sans pénalité)
+    occupe: chevaux × cours, cheval déjà pris pendant le cours
+    debut, fin (minutes), durees (heures), requis: un élément par cours
+    """
+    nb_cours = niveaux.shape[1]
+    possible = np.isfinite(niveaux) & ~occupe
+    palier = np.where(np.isfinite(niveaux), niveaux, 0.0) * PALIER
+    # Cours qui se chevauchent (un cours se chevauche lui-même: une place par cheval)
+    chevauchement = (debut[:, None] < fin[None, :]) & (fin[:, None] > debut[None, :])
+    np.fill_diagonal(chevauchement, True)
+    charge = np.asarray(charge, dtype=float).copy()
+    restantes = np.asarray(requis, dtype=int).copy()
+    selections = [[] for _ in range(nb_cours)]
+    while restantes.any():
+        places = np.repeat(np.arange(nb_cours), restantes)
+        cout = palier[:, places] + charge[:, None]
+        if maximum is not None:
+            depassement = np.clip(charge[:, None] + durees[places] - maximum[:, None], 0.0, durees[places])
+            cout += PENALITE_DEPASSEMENT * depassement
+        cout = np.where(possible[:, places], cout, INTERDIT)
+        lignes, colonnes = resoudre_affectation(cout)
+        retenues = cout[lignes, colonnes] < INTERDIT
+        if not retenues.any():
+            break
+        for cheval, place in zip(lignes[retenues], colonnes[retenues]):
+            c = places[place]
+            selections[c].append(int(cheval))
+            restantes[c] -= 1
+            charge[cheval] += durees[c]
+            possible[cheval] &= ~chevauchement[c]
+    return selections
@@ -0,0 +1,135 @@
+"""Analyses de charge et d'occupation calculées sur l'ensemble des horaires.
+
+Les horaires sont aplatis une fois en un tableau d'activités (minutes depuis
+minuit), puis chaque indicateur est un regroupement vectorisé de ce tableau;
+la charge par cheval reprend le rapport de charge du moteur.
+Toutes les valeurs sont numériques: la mise en forme se fait à l'affichage.
+"""
+import numpy as np
+import pandas as pd
+
+from regles import cle_parc
+
+TYPES_ACTIVITES = ['Cours Actif', 'Cours Passif', 'Mise en liberté']
+COLONNES_ACTIVITES = ['Cheval', 'Jour', 'Type', 'Nom', 'Parc', 'Début', 'Fin']
+# Colonnes du rapport de charge (moteur.creer_rapport) -> colonnes de l'analyse
+COLONNES_CHARGE = {
+    'Nom du Cheval': 'Cheval',
+    'Heures Actives': 'Heures actives',
+    'Heures Passives': 'Heures passives',
+    'Heures Max': 'Heures max',
+    'Dépassement': 'Dépassement',
+}
+
+
+def tableau_activites(schedule):
+    """Une ligne par activité; Début et Fin en minutes depuis minuit, Durée en heures"""
+    lignes = [
+        (cheval, jour, act['type'], act['nom'], act.get('parc'),
+         act['heure_debut'].hour * 60 + act['heure_debut'].minute,
+         act['heure_fin'].hour * 60 + act['heure_fin'].minute)
+        for cheval, planning in schedule.items() for jour, acts in planning.items() for act in acts
+    ]
+    activites = pd.DataFrame(lignes, columns=COLONNES_ACTIVITES)
+    # Une activité qui finit avant son début passe minuit (comme moteur.calculer_duree)
+    activites['Durée'] = (activites['Fin'] - activites['Début']) % (24 * 60) / 60.0
+    return activites
+
+
+def compter_par_type(activites):
+    """Nombre d'activités de la semaine par type"""
+    return activites['Type'].value_counts().reindex(TYPES_ACTIVITES, fill_value=0).to_dict()
+
+
+def charge_par_cheval(df_report):
+    """Heures actives et passives, maximum et dépassement (heures) par cheval, repris du rapport de charge"""
+    return df_report.rename(columns=COLONNES_CHARGE)[list(COLONNES_CHARGE.values())].reset_index(drop=True)
+
+
+def sorties_par_jour(activites, liste_chevaux, jours):
+    """Nombre de mises en liberté par cheval et par jour"""
+    libertes = activites[activites['Type'] == 'Mise en liberté']
+    return (pd.crosstab(libertes['Cheval'], libertes['Jour'])
+            .reindex(index=liste_chevaux, columns=jours, fill_value=0)
+            .rename_axis(index='Cheval', columns=None))
+
+
+def _capacite_parc(parc, regles):
+    try:
+        cle = cle_parc(parc.replace('Parc ', ''))
+    except ValueError:
+        return regles['capacite_parc']
+    return regles['capacites_parcs'].get(cle, regles['capacite_parc'])
+
+
+def occupation_parcs(activites, regles, pas_minutes=None):
+    """Chevaux présents et taux d'occupation par jour, parc et pas de temps"""
+    libertes = activites[(activites['Type'] == 'Mise en liberté') & activites['Parc'].notna()]
+    colonnes = ['Jour', 'Parc', 'Début', 'Chevaux', 'Capacité', 'Occupation']
+    if libertes.empty:
+        return pd.DataFrame(columns=colonnes)
+    pas = pas_minutes or (regles['pas_creneau'] if regles else 30)
+    bornes = np.arange(libertes['Début'].min() // pas * pas, libertes['Fin'].max(), pas)
+    # Présence activité × pas: la sortie chevauche [b, b + pas)
+    presence = (libertes['Début'].values[:, None] < bornes[None, :] + pas) & (libertes['Fin'].values[:, None] > bornes[None, :])
+    occupation = (pd.DataFrame(presence.astype(int), columns=bornes, index=pd.MultiIndex.from_frame(libertes[['Jour', 'Parc']]))
+                  .groupby(level=['Jour', 'Parc']).sum()
+                  .stack()
+                  .rename('Chevaux')
+                  .reset_index()
+                  .rename(columns={'level_2': 'Début'}))
+    occupation['Début'] = occupation['Début'].astype(int)
+    parcs = occupation['Parc'].unique()
+    capacites = pd.Series([_capacite_parc(p, regles) if regles else np.nan for p in parcs], index=parcs, dtype=float)
+    occupation['Capacité'] = occupation['Parc'].map(capacites)
+    occupation['Occupation'] = occupation['Chevaux'] / occupation['Capacité']
+    return occupation[colonnes]
+
+
+def remplissage_cours(activites, df_cours_manege, df_cours_autres, jours):
+    """Chevaux affectés contre Nombre_chevaux pour chaque cours planifiable"""
+    cadres = []
+    for type_activite, df, colonne_nom in [('Cours Actif', df_cours_manege, 'Cours_nom'),
+                                           ('Cours Passif', df_cours_autres, 'Coursautres_nom')]:
+        requis = pd.to_numeric(df['Nombre_chevaux'], errors='coerce')
+        # Mêmes cours que le planificateur: sans exigence, un cours n'est jamais pourvu
+        valides = (df['Jour'].isin(jours) & requis.gt(0) & df['Exigences'].map(bool)
+                   & df['Heure_début'].notna() & df['Heure_fin'].notna())
+        cours = df[valides]
+        cadres.append(pd.DataFrame({
+            'Type': type_activite,
+            'Jour': cours['Jour'].values,
+            'Nom': cours[colonne_nom].values,
+            'Début': [h.hour * 60 + h.minute for h in cours['Heure_début']],
+            'Fin': [h.hour * 60 + h.minute for h in cours['Heure_fin']],
+            'Requis': requis[valides].values,
+        }))
+    cours = pd.concat(cadres, ignore_index=True)
+    cles = ['Type', 'Jour', 'Nom', 'Début', 'Fin']
+    affectes = activites[activites['Type'].isin(['Cours Actif', 'Cours Passif'])].groupby(cles).size().rename('Affectés')
+    cours = cours.merge(affectes, left_on=cles, right_index=True, how='left')
+    cours['Affectés'] = cours['Affectés'].fillna(0).astype(int)
+    cours['Remplissage'] = cours['Affectés'] / cours['Requis']
+    return cours
+
+
+def analyser_horaires(resultat):
+    """Étape d'analyse: indicateurs numériques de la semaine (dict de DataFrames).
+
+    Les tables de cours et les règles sont optionnelles (semaine relue depuis
+    l'historique): le remplissage des cours est alors None et l'occupation
+    des parcs sans capacité.
+    """
+    jours = resultat['jours']
+    liste_chevaux = resultat['liste_chevaux']
+    activites = tableau_activites(resultat['schedule'])
+    cours = None
+    if 'df_cours_manege_tries' in resultat and 'df_cours_autres_tries' in resultat:
+        cours = remplissage_cours(activites, resultat['df_cours_manege_tries'], resultat['df_cours_autres_tries'], jours)
+    return {
+        'comptes': compter_par_type(activites),
+        'charge': charge_par_cheval(resultat['df_report']),
+        'sorties': sorties_par_jour(activites, liste_chevaux, jours),
+        'parcs': occupation_parcs(activites, resultat.get('regles')),
+        'cours': cours,
+    }
@@ -0,0 +1,224 @@
+"""Banc d'essai de la génération des horaires sur des données synthétiques.
+
+    python bench_horaires.py --chevaux 200 --repetitions 3
+    python bench_horaires.py --chevaux 200 --memoire
+    python bench_horaires.py --app
+    python bench_horaires.py --chevaux 200 --affectation optimal
+
+Mesure le temps de chaque étape (ingestion, génération, exports) et, avec
+--memoire, le pic et la mémoire retenue par étape avec les principaux sites
+d'allocation. Avec --app, mesure l'application Streamlit (AppTest, sans
+navigateur): démarrage à froid dans un processus neuf et durée d'un rerun
+après un clic, comparés aux objectifs ci-dessous. --affectation choisit le
+mode de remplissage des cours; le remplissage et l'écart-type des heures
+actives sont affichés pour comparer les modes.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from constantes import JOURS_DEFAUT, CHEVAUX_SOLOS_DEFAUT
+from export_horaires import exporter_excel, rapport_texte
+from moteur import charger_donnees, generer_horaires
+from profilage_memoire import ProfileurMemoire, etape
+from regles import MODES_AFFECTATION, charger_regles
+
+CHEMIN_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_horaires_visual_complete.py')
+
+# Objectifs de l'application (premier affichage de la page d'import; rerun d'un
+# changement de vue avec 100 chevaux générés)
+OBJECTIF_DEMARRAGE_MS = 400
+OBJECTIF_RERUN_MS = 150
+
+# Premier rerun dans un processus neuf: imports de l'application compris
+CODE_DEMARRAGE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=60)
+debut = time.perf_counter()
+app.run()
+print(json.dumps({'ms': (time.perf_counter() - debut) * 1000, 'pandas': 'pandas' in sys.modules,
+                  'erreurs': [str(e.value) for e in app.exception]}))
+"""
+
+# Clés des st.file_uploader de l'onglet d'import -> fichiers synthétiques
+FICHIERS_APP = {'chevaux': 'chevaux', 'competences': 'competences', 'manege': 'cours_manege',
+                'autres': 'cours_autres', 'amis': 'amis'}
+
+COMPETENCES_MANEGE = ['Debutant', 'Galop', 'Saut', 'Dressage']
+COMPETENCES_AUTRES = ['Therapie', 'Attelage']
+# Cours à plusieurs exigences: compétence principale -> exigence supplémentaire (Exigence_2)
+EXIGENCES_SUPPLEMENTAIRES = {'Saut': 'Galop'}
+
+
+def generer_donnees_synthetiques(nb_chevaux, graine=1):
+    """Cinq fichiers CSV (bytes) cohérents avec les règles par défaut"""
+    aleatoire = random.Random(graine)
+    noms = ['Mykola', 'Manhattan', 'Bully', 'Pepper', 'Cooper'] + [f"Cheval{i}" for i in range(max(nb_chevaux - 5, 0))]
+    noms = noms[:nb_chevaux]
+    # Environ un cours de manège par tranche de 5 chevaux et par jour
+    cours_par_heure = max(1, nb_chevaux // 30)
+
+    chevaux = ["Nom_Cheval;Max_heures_Travail"]
+    chevaux += [f"{nom};{aleatoire.choice([0, 6, 8, 10])}" for nom in noms]
+    competences = ["Nom_Cheval;Competence;Qualification"]
+    competences += [f"{nom};{comp};{aleatoire.choice(['Oui', 'Non', 'Dépannage'])}"
+                    for nom in noms for comp in COMPETENCES_MANEGE + COMPETENCES_AUTRES]
+    manege = ["Jour;Heure_début;Heure_fin;Cours_nom;Exigence_1;Exigence_2;Nombre_chevaux"]
+    autres = ["Jour;Heure_début;Heure_fin;Coursautres_nom;Exigence;Nombre_chevaux"]
+    for jour in JOURS_DEFAUT:
+        for heure in range(8, 20, 2):
+            for k in range(cours_par_heure):
+                comp = aleatoire.choice(COMPETENCES_MANEGE)
+                manege.append(f"{jour};{heure:02d}:00;{heure + 1:02d}:00;Cours {comp} {heure}h{k};{comp};"
+                              f"{EXIGENCES_SUPPLEMENTAIRES.get(comp, '')};{aleatoire.randint(2, 6)}")
+        autres.append(f"{jour};16:00;17:30;Thérapie;Therapie;{max(1, nb_chevaux // 20)}")
+        autres.append(f"{jour};10:30;11:30;Attelage;Attelage;{max(1, nb_chevaux // 40)}")
+    amis = ["Nom_Cheval;Amis"]
+    amis += [f"{nom};{noms[(i + 1) % len(noms)]}" for i, nom in enumerate(noms)]
+
+    return {
+        'chevaux': "\n".join(chevaux).encode('utf-8'),
+        'competences': "\n".join(competences).encode('utf-8'),
+        'cours_manege': "\n".join(manege).encode('utf-8'),
+        'cours_autres': "\n".join(autres).encode('utf-8'),
+        'amis': "\n".join(amis).encode('utf-8'),
+    }
+
+
+def executer_pipeline(contenus, regles, profileur=None):
+    """Exécuter le pipeline complet et retourner les durées par étape (secondes)"""
+    durees = {}
+
+    def chronometrer(nom, fonction, *args, **kwargs):
+        debut = time.perf_counter()
+        with etape(profileur, nom):
+            valeur = fonction(*args, **kwargs)
+        durees[nom] = time.perf_counter() - debut
+        return valeur
+
+    donnees = chronometrer("Ingestion", charger_donnees, contenus)
+    debut = time.perf_counter()
+    resultat = generer_horaires(donnees, JOURS_DEFAUT, CHEVAUX_SOLOS_DEFAUT, regles, profileur=profileur)
+    durees["Génération"] = time.perf_counter() - debut
+    chronometrer("Export texte", rapport_texte, resultat, JOURS_DEFAUT)
+    chronometrer("Export Excel", exporter_excel, resultat, JOURS_DEFAUT)
+    return durees, resultat
+
+
+def mesurer_demarrage(repetitions):
+    """Durées (ms) du premier rerun de l'application, chacune dans un processus neuf"""
+    mesures = []
+    for _ in range(repetitions):
+        sortie = subprocess.run([sys.executable, '-c', CODE_DEMARRAGE, CHEMIN_APP],
+                                capture_output=True, text=True, check=True, env=os.environ.copy())
+        mesures.append(json.loads(sortie.stdout.strip().splitlines()[-1]))
+    return mesures
+
+
+def mesurer_reruns(contenus, repetitions):
+    """Durées (s) de la génération puis des reruns après un changement de vue"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest ne simule pas st.file_uploader: les fichiers synthétiques sont injectés
+    def fichier_synthetique(label, *args, key=None, **kwargs):
+        if key not in FICHIERS_APP:
+            return None
+        fichier = io.BytesIO(contenus[FICHIERS_APP[key]])
+        fichier.name = f"{key}.csv"
+        return fichier
+    st.file_uploader = fichier_synthetique
+
+    app = AppTest.from_file(CHEMIN_APP, default_timeout=300)
+    app.run()
+    debut = time.perf_counter()
+    next(b for b in app.button if "Générer les horaires" in b.label).click().run()
+    generation = time.perf_counter() - debut
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+    vues = ["Par cheval", "Mises en liberté uniquement", "Vue complète", "Par jour"]
+    reruns = []
+    for k in range(repetitions * len(vues)):
+        selecteur = next(s for s in app.selectbox if s.label == "Type de vue:")
+        debut = time.perf_counter()
+        selecteur.set_value(vues[k % len(vues)]).run()
+        reruns.append(time.perf_counter() - debut)
+    return generation, reruns
+
+
+def mesurer_app(nb_chevaux, repetitions, graine):
+    # Historique dans un fichier temporaire: le banc n'écrit pas dans la base de l'écurie
+    os.environ['HORAIRES_BASE'] = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    demarrages = mesurer_demarrage(repetitions)
+    for mesure in demarrages:
+        if mesure['erreurs']:
+            raise RuntimeError(mesure['erreurs'][0])
+    generation, reruns = mesurer_reruns(generer_donnees_synthetiques(nb_chevaux, graine), repetitions)
+
+    demarrage_ms = statistics.median(m['ms'] for m in demarrages)
+    rerun_ms = statistics.median(reruns) * 1000
+    print(f"Application, {nb_chevaux} chevaux, {repetitions} répétition(s)")
+    print(f"{'Mesure':<28}{'médiane (ms)':>14}{'objectif (ms)':>15}")
+    print(f"{'Démarrage à froid':<28}{demarrage_ms:>14.1f}{OBJECTIF_DEMARRAGE_MS:>15}"
+          f"  {'OK' if demarrage_ms <= OBJECTIF_DEMARRAGE_MS else 'DÉPASSÉ'}")
+    print(f"{'Rerun (changement de vue)':<28}{rerun_ms:>14.1f}{OBJECTIF_RERUN_MS:>15}"
+          f"  {'OK' if rerun_ms <= OBJECTIF_RERUN_MS else 'DÉPASSÉ'}")
+    print(f"{'Génération (clic)':<28}{generation * 1000:>14.1f}")
+    print(f"pandas chargé au démarrage: {'oui' if any(m['pandas'] for m in demarrages) else 'non'}")
+    return demarrage_ms <= OBJECTIF_DEMARRAGE_MS and rerun_ms <= OBJECTIF_RERUN_MS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du planificateur d'horaires")
+    parser.add_argument('--chevaux', type=int, default=100)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--graine', type=int, default=1)
+    parser.add_argument('--memoire', action='store_true', help="Mesurer la mémoire par étape (tracemalloc)")
+    parser.add_argument('--app', action='store_true', help="Mesurer le démarrage et les reruns de l'application")
+    parser.add_argument('--affectation', choices=MODES_AFFECTATION, help="Mode d'affectation des cours (défaut: règles)")
+    args = parser.parse_args()
+
+    if args.app:
+        sys.exit(0 if mesurer_app(args.chevaux, args.repetitions, args.graine) else 1)
+
+    contenus = generer_donnees_synthetiques(args.chevaux, args.graine)
+    regles = charger_regles(surcharges={'mode_affectation': args.affectation} if args.affectation else None)
+
+    mesures = {}
+    for _ in range(args.repetitions):
+        durees, resultat = executer_pipeline(contenus, regles)
+        for nom, duree in durees.items():
+            mesures.setdefault(nom, []).append(duree)
+
+    cours, charge = resultat['analyses']['cours'], resultat['analyses']['charge']
+    print(f"{args.chevaux} chevaux, {args.repetitions} répétition(s), {len(resultat['conflits'])} conflit(s), "
+          f"affectation {regles['mode_affectation']}")
+    print(f"Places pourvues: {cours['Affectés'].sum()}/{cours['Requis'].sum():.0f}, "
+          f"écart-type des heures actives: {charge.loc[charge['Heures max'] > 0, 'Heures actives'].std():.2f}, "
+          f"dépassements: {(charge['Dépassement'] > 0).sum()}")
+    print(f"{'Étape':<16}{'médiane (ms)':>14}{'min (ms)':>12}")
+    for nom, durees in mesures.items():
+        print(f"{nom:<16}{statistics.median(durees) * 1000:>14.1f}{min(durees) * 1000:>12.1f}")
+
+    if args.memoire:
+        # Passe séparée: tracemalloc fausse les durées
+        with ProfileurMemoire() as profileur:
+            executer_pipeline(contenus, regles, profileur)
+        print(f"\n{'Étape':<18}{'pic (Mo)':>10}{'retenu (Mo)':>13}")
+        for ligne, mesure in zip(profileur.rapport(), profileur.etapes):
+            print(f"{ligne['Étape']:<18}{ligne['Pic (Mo)']:>10.3f}{ligne['Retenu (Mo)']:>13.3f}")
+            for site in mesure['sites']:
+                print(f"    {site['site']:<40}{site['octets'] / 1024:>10.1f} Ko")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+# Plafond mémoire par défaut du cache partagé (en octets)
+PLAFOND_DEFAUT_OCTETS = 256 * 1024 * 1024
+
+
+def calculer_cle_contenu(*morceaux):
+    """Calculer une clé SHA-256 à partir du contenu (bytes, str ou objets repr-ables)"""
+    h = hashlib.sha256()
+    for morceau in morceaux:
+        if isinstance(morceau, str):
+            morceau = morceau.encode('utf-8')
+        elif not isinstance(morceau, (bytes, bytearray)):
+            morceau = repr(morceau).encode('utf-8')
+        # Préfixer la longueur pour éviter les collisions par concaténation
+        h.update(len(morceau).to_bytes(8, 'little'))
+        h.update(morceau)
+    return h.hexdigest()
+
+
+def estimer_taille(valeur):
+    """Estimer la mémoire retenue par un résultat (octets).
+
+    Parcours de la structure: memory_usage(deep=True) pour les DataFrame et
+    Series, nbytes pour les tableaux NumPy, sys.getsizeof pour le reste.
+    Un objet partagé (chaîne de nom de cours, règles...) n'est compté qu'une fois.
+    """
+    total = 0
+    vus = set()
+    a_visiter = [valeur]
+    while a_visiter:
+        objet = a_visiter.pop()
+        if id(objet) in vus:
+            continue
+        vus.add(id(objet))
+        if hasattr(objet, 'memory_usage') and hasattr(objet, 'index'):
+            # DataFrame: une Series par colonne; Series: un entier
+            utilisation = objet.memory_usage(deep=True)
+            total += int(utilisation.sum()) if hasattr(utilisation, 'sum') else int(utilisation)
+        elif hasattr(objet, 'nbytes') and hasattr(objet, 'dtype'):
+            # sys.getsizeof inclut déjà les données d'un tableau qui les possède (pas d'une vue)
+            total += sys.getsizeof(objet) + (objet.nbytes if objet.base is not None else 0)
+            if objet.dtype == object:
+                a_visiter.extend(objet.ravel().tolist())
+        else:
+            total += sys.getsizeof(objet)
+            if isinstance(objet, dict):
+                a_visiter.extend(objet.keys())
+                a_visiter.extend(objet.values())
+            elif isinstance(objet, (list, tuple, set, frozenset)):
+                a_visiter.extend(objet)
+    return total
+
+
+class CacheResultats:
+    """Cache LRU partagé entre les sessions, borné en mémoire.
+
+    Les valeurs stockées sont considérées comme immuables: chaque session
+    ne garde que la clé (handle) et relit le résultat depuis le cache.
+    """
+
+    def __init__(self, plafond_octets=PLAFOND_DEFAUT_OCTETS):
+        self.plafond_octets = plafond_octets
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self._taille_totale = 0
+        self._succes = 0
+        self._echecs = 0
+        self._evictions = 0
+
+    def __contains__(self, cle):
+        with self._verrou:
+            return cle in self._entrees
+
+    def obtenir(self, cle):
+        """Retourner la valeur associée à la clé (None si absente ou évincée)"""
+        if cle is None:
+            return None
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self._echecs += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._succes += 1
+            return entree[0]
+
+    def consulter(self, cle):
+        """Relire une valeur sans compter de succès ni d'échec (affichages répétés à chaque rerun)"""
+        if cle is None:
+            return None
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            self._entrees.move_to_end(cle)
+            return entree[0]
+
+    def stocker(self, cle, valeur, taille=None):
+        """Stocker une valeur et évincer les plus anciennes si le plafond est dépassé"""
+        if taille is None:
+            taille = estimer_taille(valeur)
+        with self._verrou:
+            if cle in self._entrees:
+                self._taille_totale -= self._entrees.pop(cle)[1]
+            self._entrees[cle] = (valeur, taille)
+            self._taille_totale += taille
+            # Garder toujours l'entrée la plus récente, même si elle dépasse seule le plafond
+            while self._taille_totale > self.plafond_octets and len(self._entrees) > 1:
+                _, (_, taille_evincee) = self._entrees.popitem(last=False)
+                self._taille_totale -= taille_evincee
+                self._evictions += 1
+        return cle
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self._taille_totale = 0
+
+    def statistiques(self):
+        """Retourner un instantané des statistiques du cache"""
+        with self._verrou:
+            total = self._succes + self._echecs
+            return {
+                'entrees': len(self._entrees),
+                'taille_octets': self._taille_totale,
+                'plafond_octets': self.plafond_octets,
+                'succes': self._succes,
+                'echecs': self._echecs,
+                'evictions': self._evictions,
+                'taux_succes': self._succes / total if total else 0.0,
+            }
@@ -0,0 +1,6 @@
+# Fichiers CSV attendus, dans l'ordre utilisé pour les clés de contenu
+FICHIERS_REQUIS = ['chevaux', 'competences', 'cours_manege', 'cours_autres', 'amis']
+
+JOURS = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+JOURS_DEFAUT = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi']
+CHEVAUX_SOLOS_DEFAUT = ['Mykola', 'Manhattan', 'Bully']
@@ -0,0 +1,129 @@
+"""Empreintes des horaires et comparaison de deux résultats.
+
+Chaque cheval-jour reçoit une empreinte de son contenu: deux résultats se
+comparent en une passe sur les empreintes et seuls les cheval-jours
+différents sont examinés activité par activité.
+"""
+import hashlib
+from collections import Counter
+
+import pandas as pd
+
+COLONNES_MODIFICATIONS = ['Cheval', 'Jour', 'Changement', 'Type', 'Activité', 'Avant', 'Après', 'Parc avant', 'Parc après']
+
+
+def _cle_activite(act):
+    return (act['type'], act['nom'], act.get('parc'), act['heure_debut'].strftime('%H:%M'), act['heure_fin'].strftime('%H:%M'))
+
+
+def empreinte_jour(activites):
+    """Empreinte du contenu d'un cheval-jour, indépendante de l'ordre des activités"""
+    h = hashlib.blake2b(digest_size=12)
+    for cle in sorted(_cle_activite(act) for act in activites):
+        h.update(repr(cle).encode('utf-8'))
+    return h.hexdigest()
+
+
+def calculer_empreintes(schedule, cheval_jours=None):
+    """Empreintes {cheval: {jour: empreinte}}; cheval_jours limite le calcul à certaines paires"""
+    if cheval_jours is None:
+        return {cheval: {jour: empreinte_jour(acts) for jour, acts in planning.items()} for cheval, planning in schedule.items()}
+    empreintes = {}
+    for cheval, jour in cheval_jours:
+        empreintes.setdefault(cheval, {})[jour] = empreinte_jour(schedule[cheval][jour])
+    return empreintes
+
+
+def _empreintes(resultat):
+    # Les résultats produits avant l'ajout des empreintes les calculent à la volée
+    return resultat.get('empreintes') or calculer_empreintes(resultat['schedule'])
+
+
+def _identite(cle):
+    """Ce qui reste constant quand une activité est déplacée: le cours, ou la mise en liberté elle-même"""
+    type_activite, nom = cle[0], cle[1]
+    return (type_activite, None if type_activite == 'Mise en liberté' else nom)
+
+
+def comparer_horaires(avant, apres):
+    """Activités ajoutées, retirées et déplacées entre deux résultats.
+
+    Retourne une liste de dicts (une ligne par changement, colonnes
+    COLONNES_MODIFICATIONS), par cheval puis dans l'ordre des jours de la
+    semaine. Une activité retirée et une activité de même identité ajoutée
+    le même jour pour le même cheval forment un déplacement (autre horaire,
+    autre parc ou autre compagnon).
+    """
+    empreintes_avant, empreintes_apres = _empreintes(avant), _empreintes(apres)
+    # Jours dans l'ordre des semaines comparées, puis ceux absents de leur liste 'jours'
+    ordre_semaine = [*apres.get('jours', []), *avant.get('jours', [])]
+    modifications = []
+    for cheval in sorted(set(empreintes_avant) | set(empreintes_apres)):
+        jours_avant, jours_apres = empreintes_avant.get(cheval, {}), empreintes_apres.get(cheval, {})
+        presents = [*jours_apres, *jours_avant]
+        for jour in dict.fromkeys([*(j for j in ordre_semaine if j in presents), *presents]):
+            if jours_avant.get(jour) == jours_apres.get(jour):
+                continue
+            cles_avant = Counter(_cle_activite(a) for a in avant['schedule'].get(cheval, {}).get(jour, []))
+            cles_apres = Counter(_cle_activite(a) for a in apres['schedule'].get(cheval, {}).get(jour, []))
+            retirees = sorted((cles_avant - cles_apres).elements(), key=lambda c: c[3])
+            ajoutees = sorted((cles_apres - cles_avant).elements(), key=lambda c: c[3])
+
+            ajoutees_par_identite = {}
+            for cle in ajoutees:
+                ajoutees_par_identite.setdefault(_identite(cle), []).append(cle)
+            for cle in retirees:
+                candidates = ajoutees_par_identite.get(_identite(cle))
+                nouvelle = candidates.pop(0) if candidates else None
+                modifications.append({
+                    'Cheval': cheval, 'Jour': jour,
+                    'Changement': 'Déplacée' if nouvelle else 'Retirée',
+                    'Type': cle[0],
+                    'Activité': nouvelle[1] if nouvelle else cle[1],
+                    'Avant': f"{cle[3]}-{cle[4]}",
+                    'Après': f"{nouvelle[3]}-{nouvelle[4]}" if nouvelle else None,
+                    'Parc avant': cle[2],
+                    'Parc après': nouvelle[2] if nouvelle else None,
+                })
+            for restantes in ajoutees_par_identite.values():
+                for cle in restantes:
+                    modifications.append({
+                        'Cheval': cheval, 'Jour': jour, 'Changement': 'Ajoutée', 'Type': cle[0], 'Activité': cle[1],
+                        'Avant': None, 'Après': f"{cle[3]}-{cle[4]}", 'Parc avant': None, 'Parc après': cle[2],
+                    })
+    return modifications
+
+
+def resumer_modifications(modifications):
+    """Nombre de changements par nature, pour un affichage rapide"""
+    return dict(Counter(m['Changement'] for m in modifications))
+
+
+def rapport_modifications(modifications, jours):
+    """Rapport texte compact: seulement les cheval-jours modifiés, groupés par cheval"""
+    if not modifications:
+        return "Aucune modification des horaires."
+    resume = resumer_modifications(modifications)
+    lignes = ["MODIFICATIONS DES HORAIRES - " + ", ".join(f"{n} {nature.lower()}(s)" for nature, n in sorted(resume.items())), ""]
+    ordre_jours = {jour: k for k, jour in enumerate(jours)}
+    modifications = sorted(modifications, key=lambda m: (m['Cheval'], ordre_jours.get(m['Jour'], len(ordre_jours))))
+    cheval_courant = None
+    for m in modifications:
+        if m['Cheval'] != cheval_courant:
+            cheval_courant = m['Cheval']
+            lignes.append(f"{cheval_courant}:")
+        if m['Changement'] == 'Déplacée':
+            detail = f"{m['Avant']} -> {m['Après']}"
+            if m['Parc avant'] != m['Parc après']:
+                detail += f" ({m['Parc avant']} -> {m['Parc après']})"
+            lignes.append(f"  ~ {m['Jour']} {m['Type']}: {m['Activité']}, {detail}")
+        elif m['Changement'] == 'Ajoutée':
+            lignes.append(f"  + {m['Jour']} {m['Après']} {m['Type']}: {m['Activité']}")
+        else:
+            lignes.append(f"  - {m['Jour']} {m['Avant']} {m['Type']}: {m['Activité']}")
+    return "\n".join(lignes)
+
+
+def exporter_modifications_csv(modifications):
+    """Modifications au format CSV (séparateur point-virgule, comme les fichiers d'entrée)"""
+    return pd.DataFrame(modifications, columns=COLONNES_MODIFICATIONS).to_csv(sep=';', index=False)
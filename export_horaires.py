@@ -0,0 +1,102 @@
+import pandas as pd
+from datetime import datetime
+from io import BytesIO
+
+# Colonnes de la feuille/CSV des horaires complets
+COLONNES_HORAIRES = ['Cheval', 'Jour', 'Début', 'Fin', 'Type', 'Activité']
+
+
+def lignes_horaires(schedule, jours, avec_parc=False):
+    """Aplatir les horaires en une ligne par activité, triées par cheval puis par jour"""
+    all_data = []
+    for cheval in sorted(schedule.keys()):
+        for jour in jours:
+            for act in schedule[cheval].get(jour, []):
+                all_data.append({
+                    'Cheval': cheval,
+                    'Jour': jour,
+                    'Début': act['heure_debut'].strftime('%H:%M'),
+                    'Fin': act['heure_fin'].strftime('%H:%M'),
+                    'Type': act['type'],
+                    'Activité': act['nom']
+                })
+                if avec_parc:
+                    all_data[-1]['Parc'] = act.get('parc')
+    return all_data
+
+
+def formater_depassement(heures):
+    return f"Oui ({float(heures)}h)" if heures > 0 else "Non"
+
+
+def formater_rapport(df_report):
+    """Rapport de charge mis en forme pour l'affichage (heures à deux décimales, dépassement en texte)"""
+    rapport = df_report.copy()
+    for colonne in ["Heures Actives", "Heures Passives"]:
+        rapport[colonne] = rapport[colonne].map("{:.2f}".format)
+    rapport["Heures Max"] = rapport["Heures Max"].map("{:g}".format)
+    rapport["Dépassement"] = rapport["Dépassement"].map(formater_depassement)
+    return rapport
+
+
+def rapport_texte(resultat, jours):
+    """Rapport texte complet: horaires par cheval, charge de travail et conflits"""
+    rapport = []
+    rapport.append("="*70)
+    rapport.append(f"HORAIRES ÉQUESTRES - Généré le {datetime.now().strftime('%Y-%m-%d à %H:%M:%S')}")
+    rapport.append("="*70)
+    rapport.append("")
+
+    # RAPPORT 1: Horaires par cheval
+    rapport.append("="*70)
+    rapport.append("RAPPORT 1 : HORAIRE DÉTAILLÉ PAR CHEVAL")
+    rapport.append("="*70)
+    for cheval in sorted(resultat['schedule'].keys()):
+        rapport.append(f"\nHoraires pour {cheval}:")
+        for jour in jours:
+            activites = resultat['schedule'][cheval].get(jour, [])
+            if activites:
+                rapport.append(f"  **{jour}**")
+                for act in activites:
+                    rapport.append(f"    - {act['heure_debut'].strftime('%H:%M')}-{act['heure_fin'].strftime('%H:%M')} -> {act['type']}: {act['nom']}")
+            else:
+                rapport.append(f"  **{jour}**: Aucune activité planifiée.")
+
+    # RAPPORT 2: Charge de travail
+    rapport.append("\n" + "="*70)
+    rapport.append("RAPPORT 2 : CHARGE DE TRAVAIL")
+    rapport.append("="*70)
+    rapport.append(formater_rapport(resultat['df_report']).to_string())
+
+    # Conflits
+    if resultat['conflits']:
+        rapport.append("\n" + "="*70)
+        rapport.append("CONFLITS NON RÉSOLUS")
+        rapport.append("="*70)
+        for conflit in resultat['conflits']:
+            rapport.append(f"- {conflit}")
+
+    return "\n".join(rapport)
+
+
+def exporter_csv(resultat, jours):
+    """Horaires complets au format CSV (séparateur point-virgule, comme les fichiers d'entrée)"""
+    return pd.DataFrame(lignes_horaires(resultat['schedule'], jours), columns=COLONNES_HORAIRES).to_csv(sep=';', index=False)
+
+
+def exporter_excel(resultat, jours):
+    """Classeur Excel: horaires complets, charge de travail et conflits"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # Feuille 1: Horaires complets
+        all_data = lignes_horaires(resultat['schedule'], jours)
+        if all_data:
+            pd.DataFrame(all_data).to_excel(writer, sheet_name='Horaires', index=False)
+
+        # Feuille 2: Charge de travail (valeurs numériques, dépassement en heures)
+        resultat['df_report'].rename(columns={'Dépassement': 'Dépassement (h)'}).to_excel(writer, sheet_name='Charge de travail', index=False)
+
+        # Feuille 3: Conflits
+        if resultat['conflits']:
+            pd.DataFrame({'Conflits': resultat['conflits']}).to_excel(writer, sheet_name='Conflits', index=False)
+    return output.getvalue()
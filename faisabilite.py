@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from regles import lire_plage
+
+
+def _en_minutes(heures):
+    """Convertir une série d'objets time en minutes depuis minuit (NaN si manquant)"""
+    return np.array([h.hour * 60 + h.minute if pd.notna(h) else np.nan for h in heures], dtype=float)
+
+
+def _demandes_cours(donnees, jours):
+    """Une ligne par cours planifiable: type, jour, bornes en minutes, exigences (libellé et masque), nombre requis"""
+    cadres = []
+    for type_cours, df in [('Actif', donnees['df_cours_manege']), ('Passif', donnees['df_cours_autres'])]:
+        cadre = pd.DataFrame({
+            'Type': type_cours,
+            'Jour': df['Jour'].values,
+            'Début': _en_minutes(df['Heure_début']),
+            'Fin': _en_minutes(df['Heure_fin']),
+            'Exigence': [" + ".join(exigences) for exigences in df['Exigences']],
+            'Masque': df['Masque_exigences'].values,
+            'Requis': pd.to_numeric(df['Nombre_chevaux'], errors='coerce').fillna(0).values,
+        })
+        cadres.append(cadre)
+    cours = pd.concat(cadres, ignore_index=True)
+    valides = (cours['Jour'].isin(jours) & (cours['Exigence'] != '')
+               & cours['Début'].notna() & cours['Fin'].notna() & (cours['Requis'] > 0))
+    return cours[valides].reset_index(drop=True)
+
+
+def _matrice_eligibilite(donnees, cles):
+    """Matrice booléenne chevaux × (type, exigences, masque): le cheval peut-il être choisi pour ce cours"""
+    peut_travailler = donnees['peut_travailler']
+    masques_qualif = donnees['masques_qualif']
+    # Toutes les exigences de toutes les clés en un seul ET binaire
+    masques = np.array([masque for _, _, masque in cles], dtype=masques_qualif.dtype)
+    eligibilite = (masques_qualif[:, None] & masques[None, :]) == masques[None, :]
+    # Les cours de manège ne prennent que des chevaux avec un maximum d'heures positif
+    actifs = np.array([type_cours == 'Actif' for type_cours, _, _ in cles], dtype=bool)
+    eligibilite[:, actifs] &= peut_travailler[:, None]
+    return eligibilite, peut_travailler
+
+
+def _nb_creneaux_disjoints(plage, duree):
+    debut, fin = plage
+    minutes = (fin.hour * 60 + fin.minute) - (debut.hour * 60 + debut.minute)
+    return max(minutes // duree, 0)
+
+
+def verifier_faisabilite(donnees, jours, chevaux_solos, regles):
+    """Pré-vérification rapide (conditions nécessaires) avant la génération complète.
+
+    - demande par exigence sur chaque intervalle entre deux bornes de cours
+      (débuts et fins triés) contre l'offre de chevaux qualifiés, et demande
+      totale d'un intervalle contre les chevaux qualifiés pour au moins une
+      des exigences demandées: deux cours qui se suivent sans se chevaucher
+      ne sont jamais additionnés;
+    - heures de manège demandées contre la somme des Max_heures_Travail;
+    - places de parc disponibles par jour contre les chevaux à sortir.
+
+    Retourne un dict: faisable (bool), alertes (situations impossibles),
+    avertissements (dépassements inévitables mais planifiables), creneaux
+    (DataFrame des intervalles en manque) et parcs (DataFrame par jour).
+    """
+    alertes, avertissements = [], []
+    cours = _demandes_cours(donnees, jours)
+    cles = sorted(set(zip(cours['Type'], cours['Exigence'], cours['Masque'])))
+
+    # --- Demande et offre par intervalle entre bornes de cours ---
+    creneaux = pd.DataFrame(columns=['Jour', 'Début', 'Fin', 'Exigence', 'Demande', 'Offre', 'Manque'])
+    if len(cours):
+        eligibilite, peut_travailler = _matrice_eligibilite(donnees, cles)
+        offre_par_cle = eligibilite.sum(axis=0)
+
+        index_cle = {cle: k for k, cle in enumerate(cles)}
+        colonne_cle = np.array([index_cle[cle] for cle in zip(cours['Type'], cours['Exigence'], cours['Masque'])])
+        requis = cours['Requis'].values
+
+        lignes = []
+        for jour in jours:
+            du_jour = (cours['Jour'] == jour).values
+            if not du_jour.any():
+                continue
+            debuts, fins = cours['Début'].values[du_jour], cours['Fin'].values[du_jour]
+            # Bornes triées du jour: la demande est constante sur [bornes[b], bornes[b + 1])
+            bornes = np.unique(np.concatenate([debuts, fins]))
+            # +requis au début d'un cours, -requis à sa fin, puis somme cumulée (intervalle × clé)
+            variations = np.zeros((len(bornes), len(cles)))
+            np.add.at(variations, (np.searchsorted(bornes, debuts), colonne_cle[du_jour]), requis[du_jour])
+            np.add.at(variations, (np.searchsorted(bornes, fins), colonne_cle[du_jour]), -requis[du_jour])
+            demande = np.cumsum(variations, axis=0)[:-1]
+            # Par exigence
+            manque = demande - offre_par_cle[None, :]
+            for b, k in zip(*np.nonzero(manque > 0)):
+                lignes.append((jour, bornes[b], bornes[b + 1], f"{cles[k][1]} ({cles[k][0].lower()})",
+                               demande[b, k], offre_par_cle[k], manque[b, k]))
+            # Toutes exigences confondues: chevaux qualifiés pour au moins une exigence demandée
+            demandees = demande > 0
+            offre_union = ((eligibilite.astype(int) @ demandees.T.astype(int)) > 0).sum(axis=0)
+            manque_total = demande.sum(axis=1) - offre_union
+            # (utile seulement quand plusieurs exigences se disputent le même intervalle)
+            for b in np.nonzero((manque_total > 0) & (demandees.sum(axis=1) > 1))[0]:
+                lignes.append((jour, bornes[b], bornes[b + 1], "Toutes exigences",
+                               demande[b].sum(), offre_union[b], manque_total[b]))
+        if lignes:
+            creneaux = pd.DataFrame(lignes, columns=['Jour', 'Début', 'Fin', 'Exigence', 'Demande', 'Offre', 'Manque'])
+            creneaux = creneaux.drop_duplicates().sort_values(['Jour', 'Début', 'Exigence']).reset_index(drop=True)
+            for colonne in ['Début', 'Fin']:
+                creneaux[colonne] = [f"{int(m) // 60:02d}:{int(m) % 60:02d}" for m in creneaux[colonne]]
+            for ligne in creneaux.itertuples():
+                alertes.append(f"{ligne.Jour} {ligne.Début}-{ligne.Fin}: {ligne.Exigence} demande {ligne.Demande:.0f} "
+                               f"chevaux pour {ligne.Offre:.0f} qualifiés.")
+
+        # --- Heures de manège de la semaine ---
+        actifs = (cours['Type'] == 'Actif').values
+        heures_demandees = ((cours['Fin'] - cours['Début']).values[actifs] / 60 * cours['Requis'].values[actifs]).sum()
+        heures_offertes = donnees['max_heures'][peut_travailler].sum()
+        if heures_demandees > heures_offertes:
+            avertissements.append(f"Heures de manège demandées ({heures_demandees:.1f} h) supérieures au total des "
+                                  f"maximums des chevaux ({heures_offertes:.1f} h): dépassements inévitables.")
+
+    # --- Capacité des parcs ---
+    liste_chevaux = donnees['liste_chevaux']
+    solos, etalons, besoin_ami = set(chevaux_solos), set(regles['etalons']), set(regles['besoin_ami'])
+    est_solo = np.array([nom in solos for nom in liste_chevaux], dtype=bool)
+    est_etalon = np.array([nom in etalons for nom in liste_chevaux], dtype=bool)
+    duree = regles['duree_liberte']
+    nb_creneaux = sum(_nb_creneaux_disjoints(lire_plage(regles[plage]), duree) for plage in ['plage_matin', 'plage_aprem'])
+    capacites = np.array([regles['capacites_parcs'].get(p, regles['capacite_parc']) for p in range(1, regles['nb_parcs'] + 1)])
+    # Un solo occupe un parc entier: compté pour la capacité moyenne d'un parc
+    places_normales = capacites.sum() * nb_creneaux
+    demande_normale = (~est_solo).sum() + (est_solo & ~est_etalon).sum() * (capacites.mean() if len(capacites) else 0)
+    places_etalons = regles['nb_parcs_etalons'] * nb_creneaux
+    demande_etalons = (est_solo & est_etalon).sum()
+
+    parcs = pd.DataFrame({
+        'Jour': list(jours),
+        'Chevaux à sortir': len(liste_chevaux),
+        'Places parcs': places_normales,
+        'Places requises': demande_normale,
+        'Places étalons': places_etalons,
+        'Étalons solos': demande_etalons,
+    })
+    if demande_normale > places_normales:
+        alertes.append(f"Parcs: {demande_normale:.0f} places requises par jour pour {places_normales:.0f} disponibles.")
+    if demande_etalons > places_etalons:
+        alertes.append(f"Parcs étalons: {demande_etalons} étalons solos pour {places_etalons} créneaux par jour.")
+
+    # Chevaux devant sortir avec un ami mais sans ami déclaré
+    for nom in liste_chevaux:
+        if nom in besoin_ami and not donnees['amis_dict'].get(nom):
+            alertes.append(f"{nom} doit sortir avec un ami mais n'en a aucun dans BD_amis_long.csv.")
+
+    return {
+        'faisable': not alertes,
+        'alertes': alertes,
+        'avertissements': avertissements,
+        'creneaux': creneaux,
+        'parcs': parcs,
+    }
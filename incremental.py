@@ -0,0 +1,307 @@
+"""Replanification incrémentale d'une semaine déjà générée.
+
+Un jeu de changements est une liste de dicts:
+    {'type': 'cours_ajoute' | 'cours_retire', 'activite': 'Cours Actif' | 'Cours Passif', 'cours': {...}}
+    {'type': 'cours_modifie', 'activite': ..., 'avant': {...}, 'apres': {...}}
+    {'type': 'cheval_modifie', 'cheval': nom}       (maximum d'heures ou compétences changés)
+    {'type': 'amitie', 'cheval': nom}               (liste d'amis changée)
+    {'type': 'cheval_indisponible', 'cheval': nom, 'jours': [...]}
+
+Seuls les cours et les jours touchés sont replanifiés. Les jours où des
+cours de manège ont changé, seuls les chevaux dont les cours de manège ont
+changé sont replacés en liberté, avec le cheval qui sortait avec eux et les
+chevaux restés sans mise en liberté; les autres gardent leur parc et leur
+créneau. Une amitié changée replace toutes les mises en liberté de la
+semaine (les couples peuvent tous changer). Le reste est conservé tel quel.
+"""
+import pandas as pd
+
+from analyses_horaires import analyser_horaires
+from diff_horaires import calculer_empreintes
+from moteur import (
+    activite_cours, affecter, calculer_duree, choisir_chevaux_actifs, choisir_chevaux_passifs,
+    creer_rapport, est_cheval_disponible, indexer_amis, planifier_libertes_jour
+)
+from regles import ReglesCompilees
+
+# Colonnes identifiant un cours, par type d'activité
+COLONNES_COURS = {
+    'Cours Actif': ('df_cours_manege', 'Cours_nom'),
+    'Cours Passif': ('df_cours_autres', 'Coursautres_nom'),
+}
+
+
+class RegenerationNecessaire(Exception):
+    """Le changement ne peut pas être appliqué incrémentalement (ex. chevaux ajoutés ou retirés)"""
+
+
+def _lignes_cours(donnees, type_activite):
+    """Cours planifiables d'un type, sous forme de dicts (mêmes filtres que la génération complète)"""
+    cadre, _ = COLONNES_COURS[type_activite]
+    lignes = []
+    for cours in donnees[cadre].to_dict(orient='records'):
+        jour, requis = cours['Jour'], cours.get('Nombre_chevaux')
+        if not isinstance(jour, str) or not cours['Exigences'] or pd.isna(requis) or int(requis) == 0:
+            continue
+        lignes.append(cours)
+    return lignes
+
+
+def _signature(cours, type_activite):
+    # Exigences par nom: les numéros de bits dépendent de chaque jeu de données
+    _, colonne_nom = COLONNES_COURS[type_activite]
+    return (cours['Jour'], cours[colonne_nom], cours['Heure_début'], cours['Heure_fin'],
+            cours['Exigences'], int(cours['Nombre_chevaux']))
+
+
+def deduire_changements(donnees_avant, donnees_apres):
+    """Comparer deux jeux de données et retourner la liste des changements"""
+    if donnees_avant['liste_chevaux'] != donnees_apres['liste_chevaux']:
+        raise RegenerationNecessaire("La liste des chevaux a changé: régénération complète nécessaire.")
+
+    changements = []
+    for type_activite, (_, colonne_nom) in COLONNES_COURS.items():
+        avant = {_signature(c, type_activite): c for c in _lignes_cours(donnees_avant, type_activite)}
+        apres = {_signature(c, type_activite): c for c in _lignes_cours(donnees_apres, type_activite)}
+        retires = [avant[s] for s in avant.keys() - apres.keys()]
+        ajoutes = [apres[s] for s in apres.keys() - avant.keys()]
+        # Un cours retiré et ajouté le même jour sous le même nom est un cours modifié
+        ajoutes_par_nom = {}
+        for cours in ajoutes:
+            ajoutes_par_nom.setdefault((cours['Jour'], cours[colonne_nom]), []).append(cours)
+        for cours in retires:
+            candidats = ajoutes_par_nom.get((cours['Jour'], cours[colonne_nom]))
+            if candidats:
+                changements.append({'type': 'cours_modifie', 'activite': type_activite, 'avant': cours, 'apres': candidats.pop(0)})
+            else:
+                changements.append({'type': 'cours_retire', 'activite': type_activite, 'cours': cours})
+        for restants in ajoutes_par_nom.values():
+            changements.extend({'type': 'cours_ajoute', 'activite': type_activite, 'cours': cours} for cours in restants)
+
+    for rang, nom in enumerate(donnees_apres['liste_chevaux']):
+        # Une case vide (NaN) des deux côtés n'est pas un changement
+        max_avant, max_apres = donnees_avant['max_heures'][rang], donnees_apres['max_heures'][rang]
+        if not (max_avant == max_apres or (pd.isna(max_avant) and pd.isna(max_apres))) or donnees_avant['competences_dict'].get(nom) != donnees_apres['competences_dict'].get(nom):
+            changements.append({'type': 'cheval_modifie', 'cheval': nom})
+        if sorted(donnees_avant['amis_dict'].get(nom, [])) != sorted(donnees_apres['amis_dict'].get(nom, [])):
+            changements.append({'type': 'amitie', 'cheval': nom})
+    return changements
+
+
+def _est_qualifie(donnees, rang, masque, type_activite):
+    if type_activite == 'Cours Actif' and not donnees['peut_travailler'][rang]:
+        return False
+    return (donnees['masques_qualif'][rang] & masque) == masque
+
+
+def _cheval_du_conflit(conflit):
+    """Nom du cheval d'un conflit de mise en liberté ("... pour Nom (solo) le Jour.")"""
+    nom = conflit.split(" pour ", 1)[1].rsplit(" le ", 1)[0]
+    return nom[:-len(" (solo)")] if nom.endswith(" (solo)") else nom
+
+
+def _chevaux_a_replacer(jour, liste_chevaux, libertes, conflits, touches):
+    """Chevaux dont la mise en liberté d'un jour est recalculée (tous si touches est None).
+
+    Aux chevaux touchés s'ajoutent ceux qui sortaient avec eux (le couple est
+    défait) et ceux restés sans mise en liberté ce jour-là (une place a pu se libérer).
+    libertes: cheval -> mises en liberté retirées de ce jour.
+    """
+    if touches is None:
+        return set(liste_chevaux)
+    chevaux = set(touches)
+    chevaux.update(_cheval_du_conflit(c) for c in conflits if c.endswith(f" le {jour}."))
+    for cheval in list(chevaux):
+        for act in libertes.get(cheval, []):
+            if act['nom'].startswith('avec '):
+                chevaux.add(act['nom'][len('avec '):].rsplit(', ', 1)[0])
+    return chevaux & set(liste_chevaux)
+
+
+def replanifier(resultat, donnees, changements):
+    """Appliquer un jeu de changements à un résultat existant et retourner un nouveau résultat.
+
+    donnees reflète les entrées après modification. Le résultat d'origine
+    (partagé dans le cache) n'est pas modifié: seules les listes des jours
+    touchés sont recopiées.
+    """
+    jours = resultat['jours']
+    liste_chevaux = donnees['liste_chevaux']
+    if liste_chevaux != resultat['liste_chevaux']:
+        raise RegenerationNecessaire("La liste des chevaux a changé: régénération complète nécessaire.")
+
+    # Copie superficielle: les activités existantes ne sont jamais modifiées, seulement retirées ou ajoutées
+    schedule = {cheval: dict(planning) for cheval, planning in resultat['schedule'].items()}
+    copies = set()
+
+    def jour_modifiable(cheval, jour):
+        if (cheval, jour) not in copies:
+            schedule[cheval][jour] = list(schedule[cheval][jour])
+            copies.add((cheval, jour))
+        return schedule[cheval][jour]
+
+    work_hours = {cheval: dict(heures) for cheval, heures in resultat['work_hours'].items()}
+    indisponibles = {tuple(paire) for paire in resultat.get('indisponibles', [])}
+    rangs = {cheval: i for i, cheval in reversed(list(enumerate(liste_chevaux)))}
+    jours_liberte = set()
+    jours_complets = set()      # jours où toutes les mises en liberté sont replacées
+    manege_change = {}          # jour -> chevaux dont les cours de manège ont changé
+    a_remplir = {}      # signature -> (type_activite, cours, chevaux précédents)
+
+    # Index des cours actuels pour retrouver la ligne d'un cours à partir d'une activité
+    index_cours = {}
+    for type_activite, (_, colonne_nom) in COLONNES_COURS.items():
+        for cours in _lignes_cours(donnees, type_activite):
+            index_cours[(type_activite, cours['Jour'], cours[colonne_nom], cours['Heure_début'], cours['Heure_fin'])] = cours
+
+    def retirer(cheval, jour, condition):
+        """Retirer les activités d'un cheval un jour donné; retourne les activités retirées"""
+        retirees = [act for act in schedule[cheval][jour] if condition(act)]
+        if retirees:
+            jour_modifiable(cheval, jour)[:] = [act for act in schedule[cheval][jour] if not condition(act)]
+            for act in retirees:
+                if act['type'] == 'Cours Actif':
+                    manege_change.setdefault(jour, set()).add(cheval)
+                if act['type'] in COLONNES_COURS:
+                    cle_heures = 'active' if act['type'] == 'Cours Actif' else 'passive'
+                    work_hours[cheval][cle_heures] -= calculer_duree(act['heure_debut'], act['heure_fin'])
+        return retirees
+
+    def a_completer(type_activite, jour, nom, hd, hf, precedents=()):
+        cours = index_cours.get((type_activite, jour, nom, hd, hf))
+        if cours is not None and jour in jours:
+            signature = _signature(cours, type_activite)
+            _, _, anciens = a_remplir.get(signature, (None, None, []))
+            a_remplir[signature] = (type_activite, cours, anciens + list(precedents))
+            if type_activite == 'Cours Actif':
+                jours_liberte.add(jour)
+
+    def retirer_cours(type_activite, cours):
+        """Retirer un cours de tous les chevaux; retourne les chevaux qui l'avaient"""
+        _, colonne_nom = COLONNES_COURS[type_activite]
+        jour, nom, hd, hf = cours['Jour'], cours[colonne_nom], cours['Heure_début'], cours['Heure_fin']
+        if jour not in jours:
+            return []
+        if type_activite == 'Cours Actif':
+            jours_liberte.add(jour)
+        condition = lambda act: act['type'] == type_activite and act['nom'] == nom and act['heure_debut'] == hd and act['heure_fin'] == hf
+        return [cheval for cheval in liste_chevaux if retirer(cheval, jour, condition)]
+
+    for changement in changements:
+        nature = changement['type']
+        if nature == 'cours_retire':
+            retirer_cours(changement['activite'], changement['cours'])
+        elif nature in ('cours_ajoute', 'cours_modifie'):
+            type_activite = changement['activite']
+            _, colonne_nom = COLONNES_COURS[type_activite]
+            precedents = retirer_cours(type_activite, changement['avant']) if nature == 'cours_modifie' else []
+            cours = changement['apres'] if nature == 'cours_modifie' else changement['cours']
+            a_completer(type_activite, cours['Jour'], cours[colonne_nom], cours['Heure_début'], cours['Heure_fin'], precedents)
+        elif nature in ('cheval_modifie', 'cheval_indisponible'):
+            cheval = changement['cheval']
+            jours_cibles = [j for j in changement.get('jours', jours) if j in jours]
+            for jour in jours_cibles:
+                if nature == 'cheval_indisponible':
+                    indisponibles.add((cheval, jour))
+                    condition = lambda act: act['type'] in COLONNES_COURS
+                else:
+                    # Ne retirer que les cours pour lesquels le cheval n'est plus qualifié
+                    def condition(act, cheval=cheval, jour=jour):
+                        if act['type'] not in COLONNES_COURS:
+                            return False
+                        cours = index_cours.get((act['type'], jour, act['nom'], act['heure_debut'], act['heure_fin']))
+                        return cours is None or not _est_qualifie(donnees, rangs[cheval], cours['Masque_exigences'], act['type'])
+                for act in retirer(cheval, jour, condition):
+                    a_completer(act['type'], jour, act['nom'], act['heure_debut'], act['heure_fin'])
+        elif nature == 'amitie':
+            jours_liberte.update(jours)
+            jours_complets.update(jours)
+        else:
+            raise ValueError(f"Changement inconnu: {nature}")
+
+
+    def remplir(type_activite):
+        # Quelques places à compléter: la sélection gloutonne suffit, quel que soit le mode d'affectation
+        choisir = choisir_chevaux_actifs if type_activite == 'Cours Actif' else choisir_chevaux_passifs
+        _, colonne_nom = COLONNES_COURS[type_activite]
+        entrees = [e for e in a_remplir.values() if e[0] == type_activite]
+        for _, cours, precedents in sorted(entrees, key=lambda e: (e[1]['Jour'], e[1]['Heure_début'])):
+            jour, hd, hf, masque = cours['Jour'], cours['Heure_début'], cours['Heure_fin'], cours['Masque_exigences']
+            exclus = {cheval for cheval, j in indisponibles if j == jour}
+            activite = activite_cours(cours, type_activite)
+            deja = sum(1 for cheval in liste_chevaux for act in schedule[cheval][jour]
+                       if act['type'] == type_activite and act['nom'] == cours[colonne_nom] and act['heure_debut'] == hd and act['heure_fin'] == hf)
+            manque = int(cours['Nombre_chevaux']) - deja
+            if manque <= 0:
+                continue
+            # Stabilité: reprendre d'abord les chevaux qui avaient déjà ce cours
+            repris = [cheval for cheval in dict.fromkeys(precedents)
+                      if cheval not in exclus and _est_qualifie(donnees, rangs[cheval], masque, type_activite)
+                      and est_cheval_disponible(cheval, jour, hd, hf, schedule)][:manque]
+            for cheval in repris:
+                jour_modifiable(cheval, jour)
+            affecter(repris, jour, activite, schedule, work_hours)
+            nouveaux = choisir(donnees, jour, hd, hf, masque, manque - len(repris), schedule, work_hours, exclus)
+            for cheval in nouveaux:
+                jour_modifiable(cheval, jour)
+            affecter(nouveaux, jour, activite, schedule, work_hours)
+            if type_activite == 'Cours Actif':
+                manege_change.setdefault(jour, set()).update(repris + nouveaux)
+
+    # Jours touchés: mises en liberté mises de côté pour que les cours puissent prendre tout cheval libre
+    libertes = {jour: {} for jour in jours_liberte}
+    for jour in jours_liberte:
+        for cheval in liste_chevaux:
+            retirees = retirer(cheval, jour, lambda act: act['type'] == 'Mise en liberté')
+            if retirees:
+                libertes[jour][cheval] = retirees
+
+    remplir('Cours Actif')
+    conflits = list(resultat['conflits'])
+    a_replacer = {}     # jour -> chevaux dont la mise en liberté est recalculée
+    if jours_liberte:
+        regles_c = ReglesCompilees(resultat['regles'], liste_chevaux, resultat['chevaux_solos'])
+        amis_idx = indexer_amis(donnees, regles_c)
+        for jour in jours:
+            if jour not in jours_liberte:
+                continue
+            a_replacer[jour] = _chevaux_a_replacer(jour, liste_chevaux, libertes[jour], conflits,
+                                                   None if jour in jours_complets else manege_change.get(jour, set()))
+            # Les autres chevaux retrouvent leur parc et leur créneau: leurs cours de manège n'ont pas changé
+            for cheval, retirees in libertes[jour].items():
+                if cheval not in a_replacer[jour]:
+                    jour_modifiable(cheval, jour).extend(retirees)
+            for cheval in a_replacer[jour]:
+                jour_modifiable(cheval, jour)
+            conflits = [c for c in conflits if not (c.endswith(f" le {jour}.") and _cheval_du_conflit(c) in a_replacer[jour])]
+            planifier_libertes_jour(jour, liste_chevaux, regles_c, amis_idx, schedule, conflits,
+                                    [cheval in a_replacer[jour] for cheval in liste_chevaux])
+    remplir('Cours Passif')
+
+    for cheval, jour in copies:
+        schedule[cheval][jour].sort(key=lambda x: x['heure_debut'])
+
+    # Seules les empreintes des cheval-jours recopiés peuvent avoir changé
+    empreintes = {cheval: dict(par_jour) for cheval, par_jour in resultat.get('empreintes', {}).items()}
+    for cheval, par_jour in calculer_empreintes(schedule, copies if empreintes else None).items():
+        empreintes.setdefault(cheval, {}).update(par_jour)
+
+    nouveau_resultat = {
+        **resultat,
+        'schedule': schedule,
+        'empreintes': empreintes,
+        'df_report': creer_rapport(donnees, work_hours),
+        'conflits': conflits,
+        'df_cours_manege_tries': donnees['df_cours_manege'].sort_values(by=['Jour', 'Heure_début']),
+        'df_cours_autres_tries': donnees['df_cours_autres'].sort_values(by=['Jour', 'Heure_début']),
+        'work_hours': work_hours,
+        'indisponibles': sorted(indisponibles),
+        'replanification': {
+            'jours_liberte': [jour for jour in jours if jour in jours_liberte],
+            'libertes': sum(len(chevaux) for chevaux in a_replacer.values()),
+            'cours': len(a_remplir),
+            'chevaux_jours': len(copies),
+        },
+    }
+    nouveau_resultat['analyses'] = analyser_horaires(nouveau_resultat)
+    return nouveau_resultat
@@ -0,0 +1,514 @@
+import re
+
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from io import BytesIO
+from analyses_horaires import analyser_horaires
+from cache_partage import calculer_cle_contenu
+from constantes import FICHIERS_REQUIS
+from diff_horaires import calculer_empreintes
+from profilage_memoire import etape
+from regles import ReglesCompilees
+
+QUALIFICATIONS_VALIDES = ('Oui', 'Dépannage')
+
+
+class ChevalInconnu(KeyError):
+    """Cheval cité dans les compétences ou les amis mais absent de BD_chevaux.csv"""
+
+
+def _lire_csv(source):
+    """Lire un CSV séparé par des points-virgules depuis des bytes ou un fichier ouvert"""
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    return pd.read_csv(source, sep=';', engine='python')
+
+
+def charger_donnees(sources):
+    """Charger et préparer les cinq fichiers (dict nom -> bytes ou fichier ouvert)"""
+    df_chevaux = _lire_csv(sources['chevaux'])
+    df_competences = _lire_csv(sources['competences'])
+    df_cours_manege = _lire_csv(sources['cours_manege'])
+    df_cours_autres = _lire_csv(sources['cours_autres'])
+    df_amis = _lire_csv(sources['amis'])
+
+    df_chevaux['Nom_Cheval'] = df_chevaux['Nom_Cheval'].str.strip()
+    df_competences['Nom_Cheval'] = df_competences['Nom_Cheval'].str.strip()
+    df_amis['Nom_Cheval'] = df_amis['Nom_Cheval'].str.strip()
+    df_amis['Amis'] = df_amis['Amis'].str.strip()
+
+    for df in [df_cours_manege, df_cours_autres]:
+        df.dropna(subset=['Heure_début', 'Heure_fin'], inplace=True)
+        df['Heure_début'] = pd.to_datetime(df['Heure_début'], format='%H:%M', errors='coerce').dt.time
+        df['Heure_fin'] = pd.to_datetime(df['Heure_fin'], format='%H:%M', errors='coerce').dt.time
+
+    df_cours_manege['Cours_nom_norm'] = df_cours_manege['Cours_nom'].str.lower()
+    competences_dict = {cheval.strip(): {} for cheval in df_chevaux['Nom_Cheval']}
+    for fichier, df in [('BD_competences_chevaux.csv', df_competences), ('BD_amis_long.csv', df_amis)]:
+        inconnus = [str(nom) for nom in dict.fromkeys(df['Nom_Cheval']) if nom not in competences_dict]
+        if inconnus:
+            raise ChevalInconnu(f"{fichier}: chevaux absents de BD_chevaux.csv: {', '.join(inconnus)}")
+    for _, row in df_competences.iterrows():
+        competences_dict[row['Nom_Cheval']][row['Competence']] = row['Qualification']
+    amis_dict = {cheval.strip(): [] for cheval in df_chevaux['Nom_Cheval']}
+    for _, row in df_amis.iterrows():
+        if pd.notna(row['Amis']):
+            amis_dict[row['Nom_Cheval']].append(row['Amis'])
+
+    liste_chevaux = df_chevaux['Nom_Cheval'].tolist()
+    for df in [df_cours_manege, df_cours_autres]:
+        df['Exigences'] = lire_exigences(df)
+    bits_competences, masques_oui, masques_qualif = encoder_competences(
+        competences_dict, liste_chevaux, [*df_cours_manege['Exigences'], *df_cours_autres['Exigences']])
+    for df in [df_cours_manege, df_cours_autres]:
+        df['Masque_exigences'] = pd.Series([masque_exigences(bits_competences, e) for e in df['Exigences']], index=df.index, dtype=object)
+    # Premier maximum déclaré pour chaque cheval, aligné sur liste_chevaux (NaN si la case est vide)
+    max_heures = pd.to_numeric(df_chevaux.drop_duplicates('Nom_Cheval').set_index('Nom_Cheval')['Max_heures_Travail']
+                               .reindex(liste_chevaux), errors='coerce').to_numpy()
+
+    return {
+        'df_chevaux': df_chevaux,
+        'df_cours_manege': df_cours_manege,
+        'df_cours_autres': df_cours_autres,
+        'competences_dict': competences_dict,
+        'amis_dict': amis_dict,
+        'liste_chevaux': liste_chevaux,
+        'bits_competences': bits_competences,
+        'masques_oui': masques_oui,
+        'masques_qualif': masques_qualif,
+        'max_heures': max_heures,
+        # Les cours de manège ne prennent que les chevaux autorisés à travailler
+        'peut_travailler': max_heures > 0,
+    }
+
+
+def colonnes_exigences(df):
+    """Colonnes d'exigences d'un fichier de cours: Exigence puis Exigence_1..n"""
+    numerotees = sorted((c for c in df.columns if re.fullmatch(r'Exigence_\d+', c)), key=lambda c: int(c.split('_')[1]))
+    return (['Exigence'] if 'Exigence' in df.columns else []) + numerotees
+
+
+def lire_exigences(df):
+    """Compétences requises par chaque cours (tuple, sans doublon; vide si le cours n'en déclare aucune)"""
+    colonnes = colonnes_exigences(df)
+    return [tuple(dict.fromkeys(e for e in ligne if isinstance(e, str))) for ligne in df[colonnes].itertuples(index=False)]
+
+
+def encoder_competences(competences_dict, liste_chevaux, exigences):
+    """Un bit par compétence; masques 'Oui' et 'Oui' ou 'Dépannage' alignés sur liste_chevaux.
+
+    Les compétences demandées par un cours sans aucun cheval déclaré ont aussi
+    leur bit: personne ne les possède. Au-delà de 63 compétences, les masques
+    sont des entiers Python (tableaux object) au lieu d'int64.
+    """
+    noms = dict.fromkeys(comp for comps in competences_dict.values() for comp in comps)
+    noms.update(dict.fromkeys(comp for exigence in exigences for comp in exigence))
+    bits = {comp: k for k, comp in enumerate(noms)}
+    type_masque = np.int64 if len(bits) < 63 else object
+    masques_oui = np.zeros(len(liste_chevaux), dtype=type_masque)
+    masques_qualif = np.zeros(len(liste_chevaux), dtype=type_masque)
+    for i, nom in enumerate(liste_chevaux):
+        for comp, qualif in competences_dict.get(nom, {}).items():
+            if qualif in QUALIFICATIONS_VALIDES:
+                masques_qualif[i] |= 1 << bits[comp]
+                if qualif == 'Oui':
+                    masques_oui[i] |= 1 << bits[comp]
+    return bits, masques_oui, masques_qualif
+
+
+def masque_exigences(bits_competences, exigences):
+    masque = 0
+    for comp in exigences:
+        masque |= 1 << bits_competences[comp]
+    return masque
+
+
+def chevaux_eligibles(donnees, masque):
+    """Un seul ET binaire sur tous les chevaux: (qualifiés pour toutes les exigences, 'Oui' pour toutes)"""
+    return ((donnees['masques_qualif'] & masque) == masque,
+            (donnees['masques_oui'] & masque) == masque)
+
+
+def cle_generation(contenus, jours, chevaux_solos, regles):
+    """Clé de contenu d'une génération: fichiers (dict nom -> bytes), options et règles"""
+    return calculer_cle_contenu(
+        *[contenus[nom] for nom in FICHIERS_REQUIS],
+        list(jours), list(chevaux_solos), sorted(regles.items())
+    )
+
+
+def est_cheval_disponible(cheval, jour, heure_debut, heure_fin, schedule):
+    for activite in schedule[cheval][jour]:
+        if activite['heure_debut'] < heure_fin and activite['heure_fin'] > heure_debut:
+            return False
+    return True
+
+
+def calculer_duree(heure_debut, heure_fin):
+    dummy_date = datetime(2024, 1, 1)
+    dt_debut = datetime.combine(dummy_date, heure_debut)
+    dt_fin = datetime.combine(dummy_date, heure_fin)
+    if dt_fin < dt_debut:
+        dt_fin += timedelta(days=1)
+    return (dt_fin - dt_debut).total_seconds() / 3600.0
+
+
+def choisir_chevaux_actifs(donnees, jour, hd, hf, masque, requis, schedule, work_hours, exclus=()):
+    """Chevaux d'un cours de manège: qualifiés 'Oui' partout d'abord, puis les moins chargés en heures actives"""
+    liste_chevaux = donnees['liste_chevaux']
+    qualifies, oui = chevaux_eligibles(donnees, masque)
+    candidats = [{'nom': liste_chevaux[i], 'oui': oui[i]} for i in np.flatnonzero(qualifies & donnees['peut_travailler'])
+                 if liste_chevaux[i] not in exclus and est_cheval_disponible(liste_chevaux[i], jour, hd, hf, schedule)]
+    candidats.sort(key=lambda c: (0 if c['oui'] else 1, work_hours[c['nom']]['active']))
+    return [c['nom'] for c in candidats[:int(requis)]]
+
+
+def choisir_chevaux_passifs(donnees, jour, hd, hf, masque, requis, schedule, work_hours, exclus=()):
+    """Chevaux d'un autre cours: qualifiés 'Oui' partout d'abord, puis les moins chargés en heures totales"""
+    liste_chevaux = donnees['liste_chevaux']
+    qualifies, oui = chevaux_eligibles(donnees, masque)
+    candidats = [{'nom': liste_chevaux[i], 'oui': oui[i]} for i in np.flatnonzero(qualifies)
+                 if liste_chevaux[i] not in exclus and est_cheval_disponible(liste_chevaux[i], jour, hd, hf, schedule)]
+    candidats.sort(key=lambda c: (0 if c['oui'] else 1, work_hours[c['nom']]['active'] + work_hours[c['nom']]['passive']))
+    return [c['nom'] for c in candidats[:int(requis)]]
+
+
+def activite_cours(cours, type_activite):
+    """Activité d'un cours (ligne de BD_cours_manège ou BD_cours_autres)"""
+    if type_activite == 'Cours Actif':
+        return {'type': 'Cours Actif', 'nom': cours['Cours_nom'], 'nom_norm': cours['Cours_nom_norm'], 'heure_debut': cours['Heure_début'], 'heure_fin': cours['Heure_fin']}
+    return {'type': 'Cours Passif', 'nom': cours['Coursautres_nom'], 'heure_debut': cours['Heure_début'], 'heure_fin': cours['Heure_fin']}
+
+
+def affecter(chevaux, jour, activite, schedule, work_hours):
+    """Ajouter une activité de cours aux chevaux sélectionnés et compter leurs heures"""
+    cle_heures = 'active' if activite['type'] == 'Cours Actif' else 'passive'
+    duree = calculer_duree(activite['heure_debut'], activite['heure_fin'])
+    for cheval in chevaux:
+        schedule[cheval][jour].append(dict(activite))
+        work_hours[cheval][cle_heures] += duree
+
+
+def _minutes(heure):
+    return heure.hour * 60 + heure.minute
+
+
+def planifier_cours_optimal(donnees, demandes, schedule, work_hours):
+    """Mode 'optimal': les cours de chaque jour sont pourvus par affectation de coût minimal (voir affectation.py).
+
+    demandes: (jour, hd, hf, masque, requis, activite) d'un même type, dans l'ordre des cours
+    """
+    from affectation import affecter_places
+
+    liste_chevaux = donnees['liste_chevaux']
+    actif = demandes[0][5]['type'] == 'Cours Actif' if demandes else True
+    maximum = np.nan_to_num(donnees['max_heures'].astype(float))
+    # Cours actifs: seulement les chevaux autorisés à travailler, comme en mode glouton
+    retenus = donnees['peut_travailler'] if actif else np.ones(len(liste_chevaux), dtype=bool)
+    chevaux = [nom for nom, garde in zip(liste_chevaux, retenus) if garde]
+    maximum = maximum[retenus]
+    masques_qualif, masques_oui = donnees['masques_qualif'][retenus], donnees['masques_oui'][retenus]
+    demandes_par_jour = {}
+    for demande in demandes:
+        demandes_par_jour.setdefault(demande[0], []).append(demande)
+
+    for jour, demandes_jour in demandes_par_jour.items():
+        # Chevaux × cours du jour: toutes les exigences testées par un ET binaire
+        masques = np.array([d[3] for d in demandes_jour], dtype=masques_qualif.dtype)
+        qualifies = (masques_qualif[:, None] & masques[None, :]) == masques[None, :]
+        oui = (masques_oui[:, None] & masques[None, :]) == masques[None, :]
+        niveaux = np.where(oui, 0.0, np.where(qualifies, 1.0, np.inf))
+        debut = np.array([_minutes(d[1]) for d in demandes_jour])
+        fin = np.array([_minutes(d[2]) for d in demandes_jour])
+        # Activités déjà placées ce jour (cours précédents, mises en liberté) × cours du jour
+        occupe = np.zeros(niveaux.shape, dtype=bool)
+        placees = [(i, _minutes(act['heure_debut']), _minutes(act['heure_fin']))
+                   for i, nom in enumerate(chevaux) for act in schedule[nom][jour]]
+        if placees:
+            lignes, debuts, fins = np.array(placees).T
+            np.logical_or.at(occupe, lignes, (debuts[:, None] < fin[None, :]) & (fins[:, None] > debut[None, :]))
+        charge = np.array([work_hours[nom]['active'] + (0.0 if actif else work_hours[nom]['passive']) for nom in chevaux])
+        durees = np.array([calculer_duree(d[1], d[2]) for d in demandes_jour])
+        selections = affecter_places(niveaux, charge, maximum if actif else None, occupe, debut, fin, durees,
+                                     [d[4] for d in demandes_jour])
+        for demande, selection in zip(demandes_jour, selections):
+            affecter([chevaux[i] for i in selection], jour, demande[5], schedule, work_hours)
+
+
+def planifier_cours_actifs(donnees, jours, schedule, work_hours, mode='glouton'):
+    """Planification (1/3): remplir les cours de manège par ordre de jour et d'heure"""
+    df_cours_manege_tries = donnees['df_cours_manege'].sort_values(by=['Jour', 'Heure_début'])
+    demandes = []
+    for _, cours in df_cours_manege_tries.iterrows():
+        jour, hd, hf, requis = cours['Jour'], cours['Heure_début'], cours['Heure_fin'], cours['Nombre_chevaux']
+        if not isinstance(jour, str) or not cours['Exigences'] or pd.isna(requis): continue
+        if jour not in jours: continue
+        demandes.append((jour, hd, hf, cours['Masque_exigences'], int(requis), activite_cours(cours, 'Cours Actif')))
+    if mode == 'optimal':
+        planifier_cours_optimal(donnees, demandes, schedule, work_hours)
+        return df_cours_manege_tries
+    for jour, hd, hf, masque, requis, activite in demandes:
+        selection = choisir_chevaux_actifs(donnees, jour, hd, hf, masque, requis, schedule, work_hours)
+        affecter(selection, jour, activite, schedule, work_hours)
+    return df_cours_manege_tries
+
+
+def indexer_amis(donnees, regles_c):
+    """Convertir les listes d'amis en listes d'indices de chevaux"""
+    return [[regles_c.index[ami] for ami in donnees['amis_dict'].get(nom, []) if ami in regles_c.index]
+            for nom in donnees['liste_chevaux']]
+
+
+def _nb_occupations(occs, hd_creneau, hf_creneau):
+    return sum(1 for o in occs if hd_creneau < o['fin'] and hf_creneau > o['debut'])
+
+
+def _creneaux_ordonnes(cheval_nom, jour, regles_c, schedule):
+    """Créneaux candidats d'un cheval, hors marge autour de ses cours actifs et hors de ses autres activités"""
+    creneaux_interdits = []
+    a_des_cours_apres_midi = False
+    for activite in schedule[cheval_nom][jour]:
+        if activite['type'] != 'Cours Actif':
+            # Cours passifs conservés lors d'une replanification incrémentale
+            creneaux_interdits.append((activite['heure_debut'], activite['heure_fin']))
+        else:
+            h_debut_cours, h_fin_cours = activite['heure_debut'], activite['heure_fin']
+            if h_debut_cours >= regles_c.debut_apres_midi: a_des_cours_apres_midi = True
+            interdit_debut = (datetime.combine(datetime.min, h_debut_cours) - regles_c.marge_cours).time()
+            interdit_fin = (datetime.combine(datetime.min, h_fin_cours) + regles_c.marge_cours).time()
+            creneaux_interdits.append((interdit_debut, interdit_fin))
+    if a_des_cours_apres_midi:
+        creneaux = regles_c.creneaux_matin + regles_c.creneaux_aprem
+    else:
+        creneaux = regles_c.creneaux_aprem + regles_c.creneaux_matin
+    return [(hd, hf) for hd, hf in creneaux
+            if not any(hd < fin and hf > debut for debut, fin in creneaux_interdits)]
+
+
+def _occuper_parcs_existants(jour, liste_chevaux, regles_c, schedule, parcs_occupes, parcs_etalon_occupes):
+    """Compter dans les parcs les mises en liberté déjà présentes ce jour (conservées par une replanification)"""
+    for i, cheval_nom in enumerate(liste_chevaux):
+        for activite in schedule[cheval_nom][jour]:
+            if activite['type'] != 'Mise en liberté' or not activite.get('parc'):
+                continue
+            occupation = {'debut': activite['heure_debut'], 'fin': activite['heure_fin']}
+            numero = activite['parc'].replace('Parc ', '')
+            if numero.startswith('E'):
+                parc, occupes, capacites = int(numero[1:]), parcs_etalon_occupes, regles_c.capacites_parcs_etalons
+            else:
+                parc, occupes, capacites = int(numero), parcs_occupes, regles_c.capacites_parcs
+            if parc not in occupes:
+                continue
+            # Solo ou couple d'amis: parc entier, comme au placement
+            if numero.startswith('E') or regles_c.est_solo[i] or activite['nom'].startswith('avec '):
+                occupes[parc].extend([occupation] * capacites[parc])
+            else:
+                occupes[parc].append(occupation)
+
+
+def planifier_libertes_jour(jour, liste_chevaux, regles_c, amis_idx, schedule, conflits, a_placer=None):
+    """Planification (2/3) pour un jour: solos d'abord, puis les autres chevaux avec un ami si possible.
+
+    a_placer (un booléen par cheval) limite le placement à certains chevaux; les
+    mises en liberté déjà présentes dans schedule ce jour occupent leurs parcs.
+    """
+    a_placer = [True] * len(liste_chevaux) if a_placer is None else list(a_placer)
+    parcs_occupes = {p: [] for p in regles_c.capacites_parcs}
+    parcs_etalon_occupes = {p: [] for p in regles_c.capacites_parcs_etalons}
+    _occuper_parcs_existants(jour, liste_chevaux, regles_c, schedule, parcs_occupes, parcs_etalon_occupes)
+
+    # Traiter d'abord tous les chevaux solos: ils occupent un parc entier
+    for i in regles_c.ordre_solos:
+        if not a_placer[i]:
+            continue
+        cheval_nom = liste_chevaux[i]
+        est_etalon_special = regles_c.est_etalon[i]
+        parc_a_utiliser = parcs_etalon_occupes if est_etalon_special else parcs_occupes
+        capacites = regles_c.capacites_parcs_etalons if est_etalon_special else regles_c.capacites_parcs
+
+        for hd_creneau, hf_creneau in _creneaux_ordonnes(cheval_nom, jour, regles_c, schedule):
+            parc_assigne = next((p for p, occs in parc_a_utiliser.items()
+                                 if _nb_occupations(occs, hd_creneau, hf_creneau) == 0), None)
+            if parc_assigne is not None:
+                parc_nom = f"Parc E{parc_assigne}" if est_etalon_special else f"Parc {parc_assigne}"
+                details = f"Sortie seul, {parc_nom}"
+                schedule[cheval_nom][jour].append({
+                    'type': 'Mise en liberté',
+                    'nom': details,
+                    'parc': parc_nom,
+                    'heure_debut': hd_creneau,
+                    'heure_fin': hf_creneau
+                })
+                # IMPORTANT: Remplir le parc jusqu'à sa capacité pour le bloquer complètement
+                parc_a_utiliser[parc_assigne].extend(
+                    [{'debut': hd_creneau, 'fin': hf_creneau}] * capacites[parc_assigne]
+                )
+                a_placer[i] = False
+                break
+
+        if a_placer[i]:
+            conflits.append(f"Mise en liberté impossible à placer pour {cheval_nom} (solo) le {jour}.")
+            a_placer[i] = False
+
+    # Ensuite, traiter les autres chevaux
+    for i in regles_c.ordre_autres:
+        if not a_placer[i]: continue
+        cheval_nom = liste_chevaux[i]
+
+        for hd_creneau, hf_creneau in _creneaux_ordonnes(cheval_nom, jour, regles_c, schedule):
+            ami_trouve = None
+            for j in amis_idx[i]:
+                if (a_placer[j] and j != i and not regles_c.est_solo[j] and
+                    est_cheval_disponible(liste_chevaux[j], jour, hd_creneau, hf_creneau, schedule)):
+                    ami_trouve = j
+                    break
+
+            if regles_c.besoin_ami[i] and ami_trouve is None: continue
+
+            parc_a_utiliser = parcs_occupes
+            capacites = regles_c.capacites_parcs
+
+            if ami_trouve is not None:
+                parc_assigne = next((p for p, occs in parc_a_utiliser.items()
+                                     if _nb_occupations(occs, hd_creneau, hf_creneau) == 0), None)
+            else:
+                parc_assigne = next((p for p, occs in parc_a_utiliser.items()
+                                     if _nb_occupations(occs, hd_creneau, hf_creneau) < capacites[p]), None)
+
+            if parc_assigne is not None:
+                if ami_trouve is not None:
+                    ami_nom = liste_chevaux[ami_trouve]
+                    details, details_ami = f"avec {ami_nom}, Parc {parc_assigne}", f"avec {cheval_nom}, Parc {parc_assigne}"
+                    schedule[cheval_nom][jour].append({
+                        'type': 'Mise en liberté',
+                        'nom': details,
+                        'parc': f'Parc {parc_assigne}',
+                        'heure_debut': hd_creneau,
+                        'heure_fin': hf_creneau
+                    })
+                    schedule[ami_nom][jour].append({
+                        'type': 'Mise en liberté',
+                        'nom': details_ami,
+                        'parc': f'Parc {parc_assigne}',
+                        'heure_debut': hd_creneau,
+                        'heure_fin': hf_creneau
+                    })
+                    # Un couple d'amis occupe le parc entier
+                    parc_a_utiliser[parc_assigne].extend(
+                        [{'debut': hd_creneau, 'fin': hf_creneau}] * capacites[parc_assigne]
+                    )
+                    a_placer[i] = False
+                    a_placer[ami_trouve] = False
+                else:
+                    details = f"Sortie seul, Parc {parc_assigne}"
+                    schedule[cheval_nom][jour].append({
+                        'type': 'Mise en liberté',
+                        'nom': details,
+                        'parc': f'Parc {parc_assigne}',
+                        'heure_debut': hd_creneau,
+                        'heure_fin': hf_creneau
+                    })
+                    parc_a_utiliser[parc_assigne].append({'debut': hd_creneau, 'fin': hf_creneau})
+                    a_placer[i] = False
+                break
+
+    for i in regles_c.ordre_autres:
+        if a_placer[i]:
+            conflits.append(f"Mise en liberté impossible à placer pour {liste_chevaux[i]} le {jour}.")
+
+
+def planifier_cours_passifs(donnees, jours, schedule, work_hours, mode='glouton'):
+    """Planification (3/3): remplir les autres cours en équilibrant la charge totale"""
+    df_cours_autres_tries = donnees['df_cours_autres'].sort_values(by=['Jour', 'Heure_début'])
+    demandes = []
+    for _, cours in df_cours_autres_tries.iterrows():
+        jour, hd, hf = cours['Jour'], cours['Heure_début'], cours['Heure_fin']
+        requis = int(cours.get('Nombre_chevaux', 0))
+        if requis == 0 or not cours['Exigences'] or jour not in jours: continue
+        demandes.append((jour, hd, hf, cours['Masque_exigences'], requis, activite_cours(cours, 'Cours Passif')))
+    if mode == 'optimal':
+        planifier_cours_optimal(donnees, demandes, schedule, work_hours)
+        return df_cours_autres_tries
+    for jour, hd, hf, masque, requis, activite in demandes:
+        selection = choisir_chevaux_passifs(donnees, jour, hd, hf, masque, requis, schedule, work_hours)
+        affecter(selection, jour, activite, schedule, work_hours)
+    return df_cours_autres_tries
+
+
+def creer_rapport(donnees, work_hours):
+    """Rapport numérique de charge de travail par cheval (Dépassement en heures, 0 si aucun).
+
+    La mise en forme ("Oui (1.5h)", deux décimales) se fait à l'affichage.
+    """
+    liste_chevaux = donnees['liste_chevaux']
+    heures = pd.DataFrame.from_dict(work_hours, orient='index').reindex(liste_chevaux).fillna(0.0)
+    max_h = donnees['max_heures']
+    actives = heures['active'].to_numpy()
+    depassement = np.where((max_h > 0) & (actives > max_h), (actives - max_h).round(2), 0.0)
+    return pd.DataFrame({
+        "Nom du Cheval": liste_chevaux,
+        "Heures Actives": actives,
+        "Heures Passives": heures['passive'].values,
+        "Heures Max": max_h,
+        "Dépassement": depassement,
+    })
+
+
+def generer_horaires(donnees, jours, chevaux_solos, regles, progression=None, profileur=None):
+    """Générer les horaires de la semaine.
+
+    progression(pourcentage, message) est appelé entre les phases si fourni;
+    profileur (ProfileurMemoire) mesure la mémoire de chaque phase si fourni.
+    Le résultat retourné est partagé entre sessions et ne doit pas être modifié.
+    """
+    def signaler(pourcentage, message):
+        if progression is not None:
+            progression(pourcentage, message)
+
+    liste_chevaux = donnees['liste_chevaux']
+    work_hours = {cheval: {'active': 0.0, 'passive': 0.0} for cheval in liste_chevaux}
+    schedule = {cheval: {jour: [] for jour in jours} for cheval in liste_chevaux}
+    conflits = []
+
+    signaler(20, "Planification des cours actifs...")
+    with etape(profileur, "Cours actifs"):
+        df_cours_manege_tries = planifier_cours_actifs(donnees, jours, schedule, work_hours, regles['mode_affectation'])
+
+    signaler(60, "Planification des mises en liberté...")
+    with etape(profileur, "Mises en liberté"):
+        # Règles compilées une fois en tables indexées par cheval et par parc
+        regles_c = ReglesCompilees(regles, liste_chevaux, chevaux_solos)
+        amis_idx = indexer_amis(donnees, regles_c)
+        for jour in jours:
+            planifier_libertes_jour(jour, liste_chevaux, regles_c, amis_idx, schedule, conflits)
+
+    signaler(80, "Planification des cours passifs...")
+    with etape(profileur, "Cours passifs"):
+        df_cours_autres_tries = planifier_cours_passifs(donnees, jours, schedule, work_hours, regles['mode_affectation'])
+
+    with etape(profileur, "Rapport"):
+        for cheval_nom in liste_chevaux:
+            for jour in jours:
+                schedule[cheval_nom][jour].sort(key=lambda x: x['heure_debut'])
+        df_report = creer_rapport(donnees, work_hours)
+        # Empreinte par cheval-jour pour comparer rapidement deux résultats
+        empreintes = calculer_empreintes(schedule)
+
+    resultat = {
+        'schedule': schedule,
+        'empreintes': empreintes,
+        'df_report': df_report,
+        'conflits': conflits,
+        'df_cours_manege_tries': df_cours_manege_tries,
+        'df_cours_autres_tries': df_cours_autres_tries,
+        'liste_chevaux': liste_chevaux,
+        'work_hours': work_hours,
+        'jours': list(jours),
+        'chevaux_solos': list(chevaux_solos),
+        'regles': regles,
+        'indisponibles': [],
+    }
+    with etape(profileur, "Analyses"):
+        resultat['analyses'] = analyser_horaires(resultat)
+    return resultat
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+NB_SITES_DEFAUT = 5
+
+
+class ProfileurMemoire:
+    """Instrumentation mémoire optionnelle (tracemalloc) par étape du pipeline.
+
+    Pour chaque étape: pic d'allocation au-dessus du niveau de départ,
+    mémoire retenue à la fin de l'étape et principaux sites d'allocation.
+    S'utilise comme gestionnaire de contexte autour des étapes mesurées.
+    """
+
+    def __init__(self, nb_sites=NB_SITES_DEFAUT):
+        self.nb_sites = nb_sites
+        self.etapes = []
+        self._demarre_ici = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._demarre_ici = True
+        return self
+
+    def __exit__(self, *exc):
+        if self._demarre_ici:
+            tracemalloc.stop()
+            self._demarre_ici = False
+        return False
+
+    @contextmanager
+    def etape(self, nom):
+        """Mesurer une étape; les mesures s'ajoutent à self.etapes.
+
+        Si le traçage s'arrête pendant l'étape, la mesure est simplement omise.
+        """
+        avant = None
+        if tracemalloc.is_tracing():
+            try:
+                avant = tracemalloc.take_snapshot()
+                courant_avant, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+            except RuntimeError:
+                avant = None
+        try:
+            yield
+        finally:
+            if avant is not None and tracemalloc.is_tracing():
+                try:
+                    self._mesurer(nom, avant, courant_avant)
+                except RuntimeError:
+                    pass
+
+    def _mesurer(self, nom, avant, courant_avant):
+        courant_apres, pic = tracemalloc.get_traced_memory()
+        apres = tracemalloc.take_snapshot()
+        filtres = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        differences = apres.filter_traces(filtres).compare_to(avant.filter_traces(filtres), 'lineno')
+        sites = [
+            {
+                'site': f"{os.path.basename(diff.traceback[0].filename)}:{diff.traceback[0].lineno}",
+                'octets': diff.size_diff,
+                'blocs': diff.count_diff,
+            }
+            for diff in differences[:self.nb_sites] if diff.size_diff > 0
+        ]
+        self.etapes.append({
+            'etape': nom,
+            'pic_octets': max(pic - courant_avant, 0),
+            'retenu_octets': courant_apres - courant_avant,
+            'sites': sites,
+        })
+
+    def rapport(self):
+        """Une ligne par étape (sans les sites), pour un tableau ou un DataFrame"""
+        return [
+            {
+                'Étape': mesure['etape'],
+                'Pic (Mo)': round(mesure['pic_octets'] / (1024 * 1024), 3),
+                'Retenu (Mo)': round(mesure['retenu_octets'] / (1024 * 1024), 3),
+            }
+            for mesure in self.etapes
+        ]
+
+
+def etape(profileur, nom):
+    """Contexte de mesure d'une étape, neutre si le profilage est désactivé (profileur None)"""
+    if profileur is None:
+        return nullcontext()
+    return profileur.etape(nom)
+
+
+# Sessions (identifiant -> dernier rerun, horloge monotone) ayant activé le mode diagnostic;
+# le traçage vaut pour tout le processus
+_sessions_tracage = {}
+_verrou_tracage = threading.Lock()
+_tracage_demarre_ici = False
+# Une session qui ne rerun plus (onglet fermé case cochée) sort du diagnostic après ce délai
+DUREE_INSCRIPTION_S = 15 * 60
+
+
+def activer_tracage(session, actif, maintenant=None):
+    """Inscrire, rafraîchir ou retirer une session du mode diagnostic (appelé à chaque rerun).
+
+    tracemalloc démarre avec la première session inscrite et ne s'arrête
+    qu'au départ de la dernière, et seulement s'il a été démarré ici: une
+    session sans diagnostic n'interrompt jamais la mesure d'une autre. Les
+    inscriptions non rafraîchies depuis DUREE_INSCRIPTION_S secondes expirent
+    au prochain appel, quelle que soit la session qui le fait.
+    """
+    global _tracage_demarre_ici
+    maintenant = time.monotonic() if maintenant is None else maintenant
+    with _verrou_tracage:
+        if actif:
+            _sessions_tracage[session] = maintenant
+        else:
+            _sessions_tracage.pop(session, None)
+        for expiree in [s for s, vu in _sessions_tracage.items() if maintenant - vu > DUREE_INSCRIPTION_S]:
+            del _sessions_tracage[expiree]
+        if _sessions_tracage:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracage_demarre_ici = True
+        elif _tracage_demarre_ici:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            _tracage_demarre_ici = False
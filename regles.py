@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+# Fichier de règles de l'écurie chargé par défaut (surchargeable par HORAIRES_REGLES)
+CHEMIN_REGLES_DEFAUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'regles_ecurie.json')
+
+# Règles historiques, utilisées si aucun fichier ne les redéfinit
+REGLES_DEFAUT = {
+    'etalons': ['Mykola', 'Manhattan'],
+    'besoin_ami': ['Pepper', 'Cooper'],
+    'nb_parcs': 9,
+    'nb_parcs_etalons': 2,
+    'capacite_parc': 2,
+    'capacites_parcs': {},
+    'plage_matin': '07:00-12:00',
+    'plage_aprem': '13:00-15:30',
+    'debut_apres_midi': '12:00',
+    'duree_liberte': 60,
+    'pas_creneau': 30,
+    'marge_cours': 60,
+    'mode_affectation': 'glouton',
+}
+
+REGLES_LISTES = {'etalons', 'besoin_ami'}
+REGLES_ENTIERES = {'nb_parcs', 'nb_parcs_etalons', 'capacite_parc', 'duree_liberte', 'pas_creneau', 'marge_cours'}
+REGLES_PLAGES = {'plage_matin', 'plage_aprem'}
+REGLES_HEURES = {'debut_apres_midi'}
+# glouton: cours pourvus un par un; optimal: affectation de coût minimal par jour (affectation.py)
+MODES_AFFECTATION = ('glouton', 'optimal')
+
+
+def _lire_heure(texte):
+    return datetime.strptime(texte.strip(), '%H:%M').time()
+
+
+def lire_plage(texte):
+    debut, fin = texte.split('-')
+    return _lire_heure(debut), _lire_heure(fin)
+
+
+def cle_parc(parc):
+    """Clé d'un parc dans capacites_parcs: numéro (3) pour un parc normal, 'E1' pour un parc d'étalons"""
+    texte = str(parc).strip().upper()
+    if texte.startswith('E'):
+        return f"E{int(texte[1:])}"
+    return int(texte)
+
+
+def _valider_heures(cle, valeur):
+    """Refuser dès le chargement une heure ou une plage mal formée (sinon l'erreur n'apparaît qu'à la génération)"""
+    try:
+        if cle in REGLES_PLAGES:
+            debut, fin = lire_plage(valeur)
+            if debut >= fin:
+                raise ValueError("début après la fin")
+        else:
+            _lire_heure(valeur)
+    except (ValueError, AttributeError) as e:
+        attendu = 'HH:MM-HH:MM' if cle in REGLES_PLAGES else 'HH:MM'
+        raise ValueError(f"Règle {cle} invalide: {valeur!r} (attendu {attendu}; {e})")
+    return valeur.strip()
+
+
+def _fusionner(regles, nouvelles):
+    """Fusionner des règles lues dans un fichier avec les règles courantes"""
+    for cle, valeur in nouvelles.items():
+        if cle not in REGLES_DEFAUT:
+            raise ValueError(f"Règle inconnue: {cle}")
+        if cle == 'capacites_parcs':
+            regles[cle] = {**regles[cle], **{cle_parc(p): int(c) for p, c in valeur.items()}}
+        elif cle in REGLES_ENTIERES:
+            regles[cle] = int(valeur)
+        elif cle in REGLES_PLAGES or cle in REGLES_HEURES:
+            regles[cle] = _valider_heures(cle, valeur)
+        elif cle == 'mode_affectation':
+            if valeur not in MODES_AFFECTATION:
+                raise ValueError(f"Mode d'affectation inconnu: {valeur} (attendu: {', '.join(MODES_AFFECTATION)})")
+            regles[cle] = valeur
+        else:
+            regles[cle] = valeur
+    return regles
+
+
+def lire_regles_csv(contenu):
+    """Lire un CSV de règles (colonnes Regle;Valeur, une ligne par cheval pour les listes)"""
+    if isinstance(contenu, bytes):
+        contenu = contenu.decode('utf-8-sig')
+    regles = {}
+    for ligne in csv.DictReader(io.StringIO(contenu), delimiter=';'):
+        cle, valeur = ligne['Regle'].strip(), ligne['Valeur'].strip()
+        if cle in REGLES_LISTES:
+            regles.setdefault(cle, []).append(valeur)
+        elif cle == 'capacites_parcs':
+            parc, capacite = valeur.split(':')
+            regles.setdefault(cle, {})[parc] = capacite
+        else:
+            regles[cle] = valeur
+    return regles
+
+
+def charger_regles(chemin=None, contenu_csv=None, surcharges=None):
+    """Charger les règles: défauts, fichier JSON de l'écurie, CSV optionnel puis surcharges (dict)"""
+    regles = {cle: (valeur.copy() if isinstance(valeur, (list, dict)) else valeur)
+              for cle, valeur in REGLES_DEFAUT.items()}
+    chemin = chemin or os.environ.get('HORAIRES_REGLES', CHEMIN_REGLES_DEFAUT)
+    if os.path.exists(chemin):
+        with open(chemin, encoding='utf-8') as f:
+            _fusionner(regles, json.load(f))
+    if contenu_csv:
+        _fusionner(regles, lire_regles_csv(contenu_csv))
+    if surcharges:
+        _fusionner(regles, surcharges)
+    return regles
+
+
+class ReglesCompilees:
+    """Règles compilées en tables indexées par numéro de cheval et de parc.
+
+    Les boucles de placement n'utilisent que ces tables: aucun test
+    d'appartenance sur les noms ne reste dans les boucles internes.
+    """
+
+    def __init__(self, regles, liste_chevaux, chevaux_solos):
+        self.index = {nom: i for i, nom in enumerate(liste_chevaux)}
+        etalons, besoin_ami, solos = set(regles['etalons']), set(regles['besoin_ami']), set(chevaux_solos)
+        self.est_etalon = [nom in etalons for nom in liste_chevaux]
+        self.besoin_ami = [nom in besoin_ami for nom in liste_chevaux]
+        self.est_solo = [nom in solos for nom in liste_chevaux]
+        # Ordre de traitement: solos dans l'ordre de la configuration, puis les autres
+        self.ordre_solos = [self.index[nom] for nom in chevaux_solos if nom in self.index]
+        self.ordre_autres = [i for i, solo in enumerate(self.est_solo) if not solo]
+
+        # Tables de capacité par parc
+        self.capacites_parcs = {p: regles['capacites_parcs'].get(p, regles['capacite_parc'])
+                                for p in range(1, regles['nb_parcs'] + 1)}
+        self.capacites_parcs_etalons = {p: regles['capacites_parcs'].get(f"E{p}", regles['capacite_parc'])
+                                        for p in range(1, regles['nb_parcs_etalons'] + 1)}
+
+        self.debut_apres_midi = _lire_heure(regles['debut_apres_midi'])
+        self.marge_cours = timedelta(minutes=regles['marge_cours'])
+        duree, pas = timedelta(minutes=regles['duree_liberte']), timedelta(minutes=regles['pas_creneau'])
+        self.creneaux_matin = self._generer_creneaux(lire_plage(regles['plage_matin']), duree, pas)
+        self.creneaux_aprem = self._generer_creneaux(lire_plage(regles['plage_aprem']), duree, pas)
+
+    @staticmethod
+    def _generer_creneaux(plage, duree, pas):
+        """Précalculer les créneaux (début, fin) candidats d'une plage de mise en liberté"""
+        debut_plage, fin_plage = plage
+        creneaux = []
+        heure_test = debut_plage
+        while heure_test <= fin_plage:
+            hf = (datetime.combine(datetime.min, heure_test) + duree).time()
+            if hf > fin_plage and hf.hour != 0:
+                break
+            creneaux.append((heure_test, hf))
+            suivante = (datetime.combine(datetime.min, heure_test) + pas).time()
+            if suivante <= heure_test:
+                break
+            heure_test = suivante
+        return creneaux
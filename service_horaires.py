@@ -0,0 +1,410 @@
+"""Service HTTP local de génération des horaires.
+
+Permet aux autres outils de l'écurie de demander des horaires sans passer
+par la page Streamlit:
+
+    POST /instantanes  {"fichiers": {"chevaux": "<csv>", ...}}
+                       -> {"instantane": "<clé>"}
+    POST /horaires     {"fichiers": {...}} ou {"instantane": "<clé>"},
+                       options "jours", "chevaux_solos", "regles",
+                       "format": "json" (défaut), "csv" ou "xlsx",
+                       "verifier_faisabilite": true pour refuser (422) une
+                       semaine impossible sans lancer la génération
+    POST /faisabilite  mêmes entrées, pré-vérification seule
+
+Analyse des fichiers, pré-vérifications et générations passent toutes par
+le pool borné; des fichiers mal formés donnent une réponse 400.
+    GET  /metriques    compteurs du service, de la file et du cache
+    GET  /sante
+
+Lancement: python service_horaires.py --port 8502 --workers 2
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache_partage import CacheResultats, PLAFOND_DEFAUT_OCTETS
+from constantes import FICHIERS_REQUIS, JOURS, JOURS_DEFAUT, CHEVAUX_SOLOS_DEFAUT
+from export_horaires import exporter_csv, exporter_excel, lignes_horaires
+from faisabilite import verifier_faisabilite
+from moteur import ChevalInconnu, cle_generation, charger_donnees, generer_horaires
+from regles import charger_regles
+
+TYPES_CONTENU = {
+    'json': 'application/json; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class RequeteInvalide(Exception):
+    """Requête mal formée (réponse 400)"""
+
+
+class FileAttentePleine(Exception):
+    """Trop de générations en attente (réponse 503)"""
+
+
+class ServiceHoraires:
+    """Pool de workers borné avec file d'attente, déduplication et cache des résultats.
+
+    Deux requêtes identiques (mêmes fichiers, options et règles) arrivant en
+    même temps partagent la même génération; une requête déjà calculée est
+    servie depuis le cache.
+    """
+
+    def __init__(self, nb_workers=2, taille_file=8, plafond_cache_octets=PLAFOND_DEFAUT_OCTETS, delai_max=120):
+        self._executeur = ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix='generation')
+        # Places disponibles: workers occupés + générations en attente
+        self._places = threading.BoundedSemaphore(nb_workers + taille_file)
+        # Réentrant: le rappel de fin peut s'exécuter immédiatement dans le thread qui soumet
+        self._verrou = threading.RLock()
+        self._en_cours = {}
+        self.delai_max = delai_max
+        self.nb_workers, self.taille_file = nb_workers, taille_file
+        self.resultats = CacheResultats(plafond_cache_octets)
+        self.instantanes = CacheResultats(plafond_cache_octets)
+        # Fichiers déjà analysés, partagés par la pré-vérification et la génération
+        self.donnees = CacheResultats(plafond_cache_octets)
+        self._compteurs = {
+            'requetes': 0, 'verifications': 0, 'generations': 0, 'depuis_cache': 0, 'dedupliquees': 0,
+            'rejetees': 0, 'erreurs': 0, 'duree_totale_s': 0.0, 'duree_max_s': 0.0,
+        }
+
+    def _incrementer(self, compteur, valeur=1):
+        with self._verrou:
+            self._compteurs[compteur] += valeur
+
+    def enregistrer_instantane(self, contenus):
+        """Conserver les cinq fichiers pour les réutiliser par clé dans des requêtes ultérieures"""
+        cle = cle_generation(contenus, [], [], {})
+        self.instantanes.stocker(cle, contenus)
+        return cle
+
+    def lire_instantane(self, cle):
+        contenus = self.instantanes.obtenir(cle)
+        if contenus is None:
+            raise RequeteInvalide(f"Instantané inconnu ou expiré: {cle}")
+        return contenus
+
+    def _charger(self, contenus):
+        """Données analysées des cinq fichiers (dans un worker); une erreur d'ingestion est une requête invalide"""
+        cle = cle_generation(contenus, [], [], {})
+        donnees = self.donnees.consulter(cle)
+        if donnees is None:
+            try:
+                donnees = charger_donnees(contenus)
+            except ChevalInconnu as e:
+                raise RequeteInvalide(f"Cheval inconnu: {e.args[0]}")
+            except KeyError as e:
+                raise RequeteInvalide(f"Colonne manquante dans les fichiers CSV: {e}")
+            except ValueError as e:
+                raise RequeteInvalide(f"Fichiers CSV invalides: {e}")
+            self.donnees.stocker(cle, donnees)
+        return donnees
+
+    def _executer(self, cle, contenus, jours, chevaux_solos, regles):
+        debut = time.perf_counter()
+        try:
+            resultat = generer_horaires(self._charger(contenus), jours, chevaux_solos, regles)
+            self.resultats.stocker(cle, resultat)
+            return resultat
+        finally:
+            duree = time.perf_counter() - debut
+            with self._verrou:
+                self._compteurs['generations'] += 1
+                self._compteurs['duree_totale_s'] += duree
+                self._compteurs['duree_max_s'] = max(self._compteurs['duree_max_s'], duree)
+
+    def _liberer(self, cle):
+        with self._verrou:
+            self._en_cours.pop(cle, None)
+        self._places.release()
+
+    def generer(self, contenus, jours, chevaux_solos, regles):
+        """Retourner (clé, résultat), en réutilisant le cache ou une génération identique en cours"""
+        self._incrementer('requetes')
+        cle = cle_generation(contenus, jours, chevaux_solos, regles)
+        resultat = self.resultats.obtenir(cle)
+        if resultat is not None:
+            self._incrementer('depuis_cache')
+            return cle, resultat
+        return cle, self._soumettre(cle, self.resultats, self._executer, cle, contenus, jours, chevaux_solos, regles)
+
+    def verifier(self, contenus, jours, chevaux_solos, regles):
+        """Pré-vérification de faisabilité, exécutée dans le pool comme une génération"""
+        self._incrementer('verifications')
+        cle = 'faisabilite:' + cle_generation(contenus, jours, chevaux_solos, regles)
+        return self._soumettre(cle, None, lambda: verifier_faisabilite(self._charger(contenus), jours, chevaux_solos, regles))
+
+    def _soumettre(self, cle, cache, fonction, *args):
+        """Exécuter fonction(*args) dans le pool borné, en partageant un calcul identique déjà en cours"""
+        with self._verrou:
+            futur = self._en_cours.get(cle)
+            # Calcul terminé entre la lecture du cache et la prise du verrou (échec déjà compté)
+            resultat = cache.consulter(cle) if futur is None and cache is not None else None
+            if futur is not None:
+                self._compteurs['dedupliquees'] += 1
+            elif resultat is not None:
+                self._compteurs['depuis_cache'] += 1
+                return resultat
+            else:
+                if not self._places.acquire(blocking=False):
+                    self._compteurs['rejetees'] += 1
+                    raise FileAttentePleine("File d'attente pleine, réessayer plus tard")
+                futur = self._executeur.submit(fonction, *args)
+                self._en_cours[cle] = futur
+                futur.add_done_callback(lambda _f, cle=cle: self._liberer(cle))
+        try:
+            return futur.result(timeout=self.delai_max)
+        except Exception:
+            self._incrementer('erreurs')
+            raise
+
+    def metriques(self):
+        with self._verrou:
+            compteurs = dict(self._compteurs)
+            en_cours = len(self._en_cours)
+        compteurs['duree_moyenne_s'] = compteurs['duree_totale_s'] / compteurs['generations'] if compteurs['generations'] else 0.0
+        return {
+            **compteurs,
+            'en_cours': en_cours,
+            'workers': self.nb_workers,
+            'taille_file': self.taille_file,
+            'cache_resultats': self.resultats.statistiques(),
+            'cache_instantanes': self.instantanes.statistiques(),
+            'cache_donnees': self.donnees.statistiques(),
+        }
+
+    def arreter(self):
+        self._executeur.shutdown(wait=True)
+
+
+def _serialiser(valeur):
+    """Conversion JSON des scalaires numpy/pandas"""
+    if hasattr(valeur, 'item'):
+        return valeur.item()
+    return str(valeur)
+
+
+def _enregistrements(df):
+    """Lignes d'un DataFrame pour le JSON: NaN devient null (NaN nu n'est pas du JSON valide)"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def resultat_en_json(cle, resultat):
+    jours = resultat['jours']
+    return {
+        'cle': cle,
+        'jours': jours,
+        'horaires': lignes_horaires(resultat['schedule'], jours, avec_parc=True),
+        'charge': _enregistrements(resultat['df_report']),
+        'conflits': resultat['conflits'],
+    }
+
+
+def faisabilite_en_json(rapport):
+    return {
+        'faisable': rapport['faisable'],
+        'alertes': rapport['alertes'],
+        'avertissements': rapport['avertissements'],
+        'creneaux': _enregistrements(rapport['creneaux']),
+        'parcs': _enregistrements(rapport['parcs']),
+    }
+
+
+class GestionnaireHoraires(BaseHTTPRequestHandler):
+    server_version = 'ServiceHoraires/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.journaliser:
+            super().log_message(format, *args)
+
+    def _repondre(self, statut, corps, type_contenu=TYPES_CONTENU['json']):
+        if not isinstance(corps, (bytes, bytearray)):
+            if not isinstance(corps, str):
+                corps = json.dumps(corps, ensure_ascii=False, default=_serialiser, allow_nan=False)
+            corps = corps.encode('utf-8')
+        self.send_response(statut)
+        self.send_header('Content-Type', type_contenu)
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def _lire_json(self):
+        longueur = int(self.headers.get('Content-Length', 0))
+        try:
+            requete = json.loads(self.rfile.read(longueur) or b'{}')
+        except json.JSONDecodeError as e:
+            raise RequeteInvalide(f"JSON invalide: {e}")
+        if not isinstance(requete, dict):
+            raise RequeteInvalide("Le corps de la requête doit être un objet JSON")
+        return requete
+
+    def _lire_fichiers(self, requete):
+        if 'instantane' in requete:
+            if not isinstance(requete['instantane'], str):
+                raise RequeteInvalide("instantane doit être une clé (chaîne)")
+            return self.service.lire_instantane(requete['instantane'])
+        fichiers = requete.get('fichiers') or {}
+        if not isinstance(fichiers, dict):
+            raise RequeteInvalide("fichiers doit être un objet nom -> contenu CSV")
+        manquants = [nom for nom in FICHIERS_REQUIS if nom not in fichiers]
+        if manquants:
+            raise RequeteInvalide(f"Fichiers manquants: {', '.join(manquants)}")
+        non_textes = [nom for nom in FICHIERS_REQUIS if not isinstance(fichiers[nom], str)]
+        if non_textes:
+            raise RequeteInvalide(f"Le contenu de ces fichiers doit être du texte CSV: {', '.join(non_textes)}")
+        return {nom: fichiers[nom].encode('utf-8') for nom in FICHIERS_REQUIS}
+
+    def do_GET(self):
+        if self.path == '/metriques':
+            self._repondre(200, self.service.metriques())
+        elif self.path == '/sante':
+            self._repondre(200, {'statut': 'ok'})
+        else:
+            self._repondre(404, {'erreur': f"Chemin inconnu: {self.path}"})
+
+    def do_POST(self):
+        try:
+            requete = self._lire_json()
+            if self.path == '/instantanes':
+                self._repondre(201, {'instantane': self.service.enregistrer_instantane(self._lire_fichiers(requete))})
+            elif self.path == '/horaires':
+                self._traiter_horaires(requete)
+            elif self.path == '/faisabilite':
+                jours, chevaux_solos, regles = self._lire_options(requete)
+                rapport = self.service.verifier(self._lire_fichiers(requete), jours, chevaux_solos, regles)
+                self._repondre(200, faisabilite_en_json(rapport))
+            else:
+                self._repondre(404, {'erreur': f"Chemin inconnu: {self.path}"})
+        except RequeteInvalide as e:
+            self._repondre(400, {'erreur': str(e)})
+        except FileAttentePleine as e:
+            self._repondre(503, {'erreur': str(e)})
+        except TimeoutError:
+            self._repondre(504, {'erreur': "Génération trop longue"})
+        except Exception as e:
+            self._repondre(500, {'erreur': f"Erreur lors de la génération: {e}"})
+
+    def _lire_options(self, requete):
+        jours = requete.get('jours', JOURS_DEFAUT)
+        chevaux_solos = requete.get('chevaux_solos', CHEVAUX_SOLOS_DEFAUT)
+        for option, valeur in [('jours', jours), ('chevaux_solos', chevaux_solos)]:
+            if not isinstance(valeur, list) or not all(isinstance(v, str) for v in valeur):
+                raise RequeteInvalide(f"{option} doit être une liste de noms")
+        inconnus = [jour for jour in jours if jour not in JOURS]
+        if inconnus:
+            raise RequeteInvalide(f"Jours inconnus: {', '.join(inconnus)}")
+        surcharges = requete.get('regles')
+        if surcharges is not None and not isinstance(surcharges, dict):
+            raise RequeteInvalide("regles doit être un objet règle -> valeur")
+        try:
+            regles = charger_regles(surcharges=surcharges)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise RequeteInvalide(f"Règles invalides: {e}")
+        return jours, chevaux_solos, regles
+
+    def _traiter_horaires(self, requete):
+        format_sortie = requete.get('format', 'json')
+        if format_sortie not in TYPES_CONTENU:
+            raise RequeteInvalide(f"Format inconnu: {format_sortie}")
+        jours, chevaux_solos, regles = self._lire_options(requete)
+        contenus = self._lire_fichiers(requete)
+
+        # Écarter une semaine impossible avant la génération complète
+        if requete.get('verifier_faisabilite'):
+            rapport = self.service.verifier(contenus, jours, chevaux_solos, regles)
+            if not rapport['faisable']:
+                self._repondre(422, faisabilite_en_json(rapport))
+                return
+
+        cle, resultat = self.service.generer(contenus, jours, chevaux_solos, regles)
+
+        if format_sortie == 'csv':
+            self._repondre(200, exporter_csv(resultat, jours), TYPES_CONTENU['csv'])
+        elif format_sortie == 'xlsx':
+            self._repondre(200, exporter_excel(resultat, jours), TYPES_CONTENU['xlsx'])
+        else:
+            self._repondre(200, resultat_en_json(cle, resultat))
+
+
+def creer_serveur(hote='127.0.0.1', port=8502, nb_workers=2, taille_file=8,
+                  plafond_cache_octets=PLAFOND_DEFAUT_OCTETS, journaliser=True):
+    """Créer le serveur (port=0 choisit un port libre, lisible dans server_address)"""
+    serveur = ThreadingHTTPServer((hote, port), GestionnaireHoraires)
+    serveur.daemon_threads = True
+    serveur.service = ServiceHoraires(nb_workers, taille_file, plafond_cache_octets)
+    serveur.journaliser = journaliser
+    return serveur
+
+
+class ClientHoraires:
+    """Client minimal du service, utilisable par les outils internes et pour les essais locaux"""
+
+    def __init__(self, url='http://127.0.0.1:8502', delai=300):
+        self.url, self.delai = url.rstrip('/'), delai
+
+    def _appeler(self, methode, chemin, corps=None):
+        donnees = json.dumps(corps).encode('utf-8') if corps is not None else None
+        requete = urllib.request.Request(self.url + chemin, data=donnees, method=methode,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(requete, timeout=self.delai) as reponse:
+            contenu = reponse.read()
+            if reponse.headers.get_content_type() == 'application/json':
+                return json.loads(contenu)
+            return contenu
+
+    def enregistrer_instantane(self, fichiers):
+        return self._appeler('POST', '/instantanes', {'fichiers': fichiers})['instantane']
+
+    def horaires(self, fichiers=None, instantane=None, format='json', **options):
+        corps = {'format': format, **options}
+        if instantane is not None:
+            corps['instantane'] = instantane
+        else:
+            corps['fichiers'] = fichiers
+        return self._appeler('POST', '/horaires', corps)
+
+    def faisabilite(self, fichiers=None, instantane=None, **options):
+        corps = dict(options)
+        if instantane is not None:
+            corps['instantane'] = instantane
+        else:
+            corps['fichiers'] = fichiers
+        return self._appeler('POST', '/faisabilite', corps)
+
+    def metriques(self):
+        return self._appeler('GET', '/metriques')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP local de génération des horaires équestres")
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--file', type=int, default=8, help="Nombre maximal de générations en attente")
+    parser.add_argument('--cache-mo', type=float, default=PLAFOND_DEFAUT_OCTETS / (1024 * 1024))
+    args = parser.parse_args()
+
+    serveur = creer_serveur(args.hote, args.port, args.workers, args.file, int(args.cache_mo * 1024 * 1024))
+    print(f"Service des horaires sur http://{args.hote}:{serveur.server_address[1]}")
+    try:
+        serveur.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        serveur.server_close()
+        serveur.service.arreter()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""Historique des semaines générées dans une base SQLite locale.
+
+Chaque résultat enregistré devient une semaine: une ligne par activité,
+la charge par cheval et les conflits. Tous les index commencent par la
+semaine, puis permettent de lire un seul cheval, un seul parc ou un seul
+jour de cette semaine sans parcourir le reste de l'historique:
+
+    activites (semaine_id, cheval, jour)
+    activites (semaine_id, jour, parc, debut)
+    activites (semaine_id, parc, debut)
+    activites (semaine_id, type, jour)
+
+pandas et le moteur ne sont importés qu'à la lecture des charges et des
+exports: lister les semaines (à chaque rerun de l'application) reste léger.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, time
+
+# Base par défaut, surchargeable par la variable d'environnement HORAIRES_BASE
+CHEMIN_BASE_DEFAUT = os.environ.get('HORAIRES_BASE', 'horaires_historique.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS semaines (
+    id INTEGER PRIMARY KEY,
+    cle TEXT UNIQUE NOT NULL,
+    libelle TEXT,
+    cree_le TEXT NOT NULL,
+    jours TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS activites (
+    semaine_id INTEGER NOT NULL REFERENCES semaines(id) ON DELETE CASCADE,
+    cheval TEXT NOT NULL,
+    jour TEXT NOT NULL,
+    debut TEXT NOT NULL,
+    fin TEXT NOT NULL,
+    type TEXT NOT NULL,
+    nom TEXT NOT NULL,
+    parc TEXT
+);
+CREATE TABLE IF NOT EXISTS charges (
+    semaine_id INTEGER NOT NULL REFERENCES semaines(id) ON DELETE CASCADE,
+    ordre INTEGER NOT NULL,
+    cheval TEXT NOT NULL,
+    heures_actives REAL NOT NULL,
+    heures_passives REAL NOT NULL,
+    heures_max REAL,
+    PRIMARY KEY (semaine_id, cheval)
+);
+CREATE TABLE IF NOT EXISTS conflits (
+    semaine_id INTEGER NOT NULL REFERENCES semaines(id) ON DELETE CASCADE,
+    ordre INTEGER NOT NULL,
+    texte TEXT NOT NULL
+);
+-- Anciens index (semaine en dernière colonne): parcours de tout l'historique
+DROP INDEX IF EXISTS idx_activites_cheval_jour;
+DROP INDEX IF EXISTS idx_activites_jour_parc_debut;
+DROP INDEX IF EXISTS idx_activites_type_jour;
+CREATE INDEX IF NOT EXISTS idx_activites_semaine_cheval_jour ON activites (semaine_id, cheval, jour);
+CREATE INDEX IF NOT EXISTS idx_activites_semaine_jour_parc ON activites (semaine_id, jour, parc, debut);
+CREATE INDEX IF NOT EXISTS idx_activites_semaine_parc ON activites (semaine_id, parc, debut);
+CREATE INDEX IF NOT EXISTS idx_activites_semaine_type_jour ON activites (semaine_id, type, jour);
+CREATE INDEX IF NOT EXISTS idx_conflits_semaine ON conflits (semaine_id, ordre);
+"""
+
+
+def _reel_ou_null(valeur):
+    """Nombre pour SQLite, None (NULL) pour une valeur absente ou NaN"""
+    if valeur is None:
+        return None
+    valeur = float(valeur)
+    return None if valeur != valeur else valeur
+
+
+class StockHoraires:
+    """Accès à la base historique; une connexion par opération (utilisable depuis plusieurs sessions)"""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or CHEMIN_BASE_DEFAUT
+        with self._connexion() as connexion:
+            # WAL: les lectures des autres sessions ne bloquent pas les enregistrements
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.executescript(SCHEMA)
+            self._migrer(connexion)
+
+    @staticmethod
+    def _migrer(connexion):
+        """Bases créées avec heures_max NOT NULL: reconstruire charges (SQLite ne modifie pas une contrainte)"""
+        colonnes = {ligne['name']: ligne for ligne in connexion.execute("PRAGMA table_info(charges)")}
+        if not colonnes['heures_max']['notnull']:
+            return
+        connexion.executescript("""
+            BEGIN;
+            ALTER TABLE charges RENAME TO charges_ancienne;
+            CREATE TABLE charges (
+                semaine_id INTEGER NOT NULL REFERENCES semaines(id) ON DELETE CASCADE,
+                ordre INTEGER NOT NULL,
+                cheval TEXT NOT NULL,
+                heures_actives REAL NOT NULL,
+                heures_passives REAL NOT NULL,
+                heures_max REAL,
+                PRIMARY KEY (semaine_id, cheval)
+            );
+            INSERT INTO charges SELECT * FROM charges_ancienne;
+            DROP TABLE charges_ancienne;
+            COMMIT;
+        """)
+
+    @contextmanager
+    def _connexion(self):
+        connexion = sqlite3.connect(self.chemin, timeout=30)
+        connexion.row_factory = sqlite3.Row
+        connexion.execute("PRAGMA foreign_keys=ON")
+        try:
+            with connexion:
+                yield connexion
+        finally:
+            connexion.close()
+
+    def enregistrer(self, resultat, cle, libelle=None):
+        """Enregistrer un résultat sous sa clé de contenu; retourne l'identifiant de la semaine"""
+        with self._connexion() as connexion:
+            existante = connexion.execute("SELECT id FROM semaines WHERE cle = ?", (cle,)).fetchone()
+            if existante is not None:
+                return existante['id']
+            cree_le = datetime.now().isoformat(timespec='seconds')
+            curseur = connexion.execute(
+                "INSERT INTO semaines (cle, libelle, cree_le, jours) VALUES (?, ?, ?, ?)",
+                (cle, libelle or f"Semaine du {cree_le[:10]}", cree_le, json.dumps(resultat['jours']))
+            )
+            semaine_id = curseur.lastrowid
+            connexion.executemany(
+                "INSERT INTO activites (semaine_id, cheval, jour, debut, fin, type, nom, parc) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((semaine_id, cheval, jour, act['heure_debut'].strftime('%H:%M'), act['heure_fin'].strftime('%H:%M'),
+                  act['type'], act['nom'], act.get('parc'))
+                 for cheval, planning in resultat['schedule'].items() for jour, acts in planning.items() for act in acts)
+            )
+            heures_max = dict(zip(resultat['df_report']['Nom du Cheval'], resultat['df_report']['Heures Max']))
+            # Un cheval déclaré deux fois n'a qu'un planning: une seule ligne; maximum vide -> NULL
+            connexion.executemany(
+                "INSERT INTO charges (semaine_id, ordre, cheval, heures_actives, heures_passives, heures_max) VALUES (?, ?, ?, ?, ?, ?)",
+                ((semaine_id, ordre, cheval, resultat['work_hours'][cheval]['active'], resultat['work_hours'][cheval]['passive'],
+                  _reel_ou_null(heures_max.get(cheval)))
+                 for ordre, cheval in enumerate(dict.fromkeys(resultat['liste_chevaux'])))
+            )
+            connexion.executemany(
+                "INSERT INTO conflits (semaine_id, ordre, texte) VALUES (?, ?, ?)",
+                ((semaine_id, ordre, texte) for ordre, texte in enumerate(resultat['conflits']))
+            )
+            return semaine_id
+
+    def semaines(self):
+        """Semaines enregistrées, de la plus récente à la plus ancienne"""
+        with self._connexion() as connexion:
+            lignes = connexion.execute("""
+                SELECT s.id, s.libelle, s.cree_le, s.jours,
+                       (SELECT COUNT(*) FROM conflits c WHERE c.semaine_id = s.id) AS nb_conflits
+                FROM semaines s ORDER BY s.id DESC
+            """).fetchall()
+        return [{**dict(ligne), 'jours': json.loads(ligne['jours'])} for ligne in lignes]
+
+    def semaine_par_cle(self, cle):
+        with self._connexion() as connexion:
+            ligne = connexion.execute("SELECT id FROM semaines WHERE cle = ?", (cle,)).fetchone()
+        return ligne['id'] if ligne is not None else None
+
+    def supprimer(self, semaine_id):
+        with self._connexion() as connexion:
+            connexion.execute("DELETE FROM semaines WHERE id = ?", (semaine_id,))
+
+    def activites(self, semaine_id, cheval=None, jour=None, parc=None, type_activite=None):
+        """Activités d'une semaine filtrées par cheval, jour, parc et/ou type (une requête indexée)"""
+        conditions, parametres = ["semaine_id = ?"], [semaine_id]
+        for colonne, valeur in [('cheval', cheval), ('jour', jour), ('parc', parc), ('type', type_activite)]:
+            if valeur is not None:
+                conditions.append(f"{colonne} = ?")
+                parametres.append(valeur)
+        with self._connexion() as connexion:
+            lignes = connexion.execute(
+                f"SELECT cheval, jour, debut, fin, type, nom, parc FROM activites WHERE {' AND '.join(conditions)} ORDER BY debut",
+                parametres
+            ).fetchall()
+        return [dict(ligne) for ligne in lignes]
+
+    def horaires(self, semaine_id, cheval=None, jour=None, parc=None, type_activite=None):
+        """Sous-ensemble de la semaine au format schedule {cheval: {jour: [activités]}}"""
+        jours = [jour] if jour is not None else self.jours(semaine_id)
+        chevaux = [cheval] if cheval is not None else self.chevaux(semaine_id)
+        schedule = {nom: {j: [] for j in jours} for nom in chevaux}
+        for ligne in self.activites(semaine_id, cheval, jour, parc, type_activite):
+            act = {
+                'type': ligne['type'],
+                'nom': ligne['nom'],
+                'heure_debut': time.fromisoformat(ligne['debut']),
+                'heure_fin': time.fromisoformat(ligne['fin']),
+            }
+            if ligne['type'] == 'Cours Actif':
+                act['nom_norm'] = ligne['nom'].lower()
+            if ligne['parc'] is not None:
+                act['parc'] = ligne['parc']
+            schedule.setdefault(ligne['cheval'], {j: [] for j in jours})[ligne['jour']].append(act)
+        return schedule
+
+    def chevaux(self, semaine_id):
+        with self._connexion() as connexion:
+            lignes = connexion.execute("SELECT cheval FROM charges WHERE semaine_id = ? ORDER BY ordre", (semaine_id,)).fetchall()
+        return [ligne['cheval'] for ligne in lignes]
+
+    def parcs(self, semaine_id):
+        with self._connexion() as connexion:
+            lignes = connexion.execute(
+                "SELECT DISTINCT parc FROM activites WHERE semaine_id = ? AND parc IS NOT NULL", (semaine_id,)
+            ).fetchall()
+        return sorted((ligne['parc'] for ligne in lignes), key=lambda p: (len(p), p))
+
+    def jours(self, semaine_id):
+        with self._connexion() as connexion:
+            ligne = connexion.execute("SELECT jours FROM semaines WHERE id = ?", (semaine_id,)).fetchone()
+        return json.loads(ligne['jours']) if ligne is not None else []
+
+    def compter_activites(self, semaine_id):
+        """Nombre d'activités par type pour la semaine"""
+        with self._connexion() as connexion:
+            lignes = connexion.execute(
+                "SELECT type, COUNT(*) AS n FROM activites WHERE semaine_id = ? GROUP BY type", (semaine_id,)
+            ).fetchall()
+        return {ligne['type']: ligne['n'] for ligne in lignes}
+
+    def conflits(self, semaine_id):
+        with self._connexion() as connexion:
+            lignes = connexion.execute("SELECT texte FROM conflits WHERE semaine_id = ? ORDER BY ordre", (semaine_id,)).fetchall()
+        return [ligne['texte'] for ligne in lignes]
+
+    def charges(self, semaine_id, cheval=None):
+        """Charge de travail par cheval (DataFrame numérique)"""
+        import pandas as pd
+
+        requete = "SELECT cheval, heures_actives, heures_passives, heures_max FROM charges WHERE semaine_id = ?"
+        parametres = [semaine_id]
+        if cheval is not None:
+            requete += " AND cheval = ?"
+            parametres.append(cheval)
+        with self._connexion() as connexion:
+            return pd.read_sql_query(requete + " ORDER BY ordre", connexion, params=parametres)
+
+    def rapport_charge(self, semaine_id, cheval=None):
+        """Rapport de charge de travail (mêmes colonnes que le résultat généré)"""
+        import pandas as pd
+        from moteur import creer_rapport
+
+        charges = self.charges(semaine_id, cheval)
+        liste_chevaux = list(charges['cheval'])
+        work_hours = {
+            ligne.cheval: {'active': ligne.heures_actives, 'passive': ligne.heures_passives}
+            for ligne in charges.itertuples()
+        }
+        donnees = {'liste_chevaux': liste_chevaux, 'max_heures': charges['heures_max'].to_numpy(dtype=float)}
+        return creer_rapport(donnees, work_hours), work_hours
+
+    def charger_resultat(self, semaine_id):
+        """Reconstruire un résultat complet (pour les exports de la semaine entière)"""
+        df_report, work_hours = self.rapport_charge(semaine_id)
+        return {
+            'schedule': self.horaires(semaine_id),
+            'df_report': df_report,
+            'conflits': self.conflits(semaine_id),
+            'liste_chevaux': list(work_hours),
+            'work_hours': work_hours,
+            'jours': self.jours(semaine_id),
+        }
+
+    def exporter_extrait_csv(self, semaine_id, cheval=None, jour=None, parc=None, type_activite=None):
+        """Extrait CSV (un cheval, un parc ou un jour) lu directement dans la base"""
+        import pandas as pd
+        from export_horaires import COLONNES_HORAIRES
+
+        lignes = self.activites(semaine_id, cheval, jour, parc, type_activite)
+        ordre_jours = {j: k for k, j in enumerate(self.jours(semaine_id))}
+        lignes.sort(key=lambda l: (l['cheval'], ordre_jours.get(l['jour'], len(ordre_jours)), l['debut']))
+        extrait = pd.DataFrame(
+            [(l['cheval'], l['jour'], l['debut'], l['fin'], l['type'], l['nom'], l['parc']) for l in lignes],
+            columns=COLONNES_HORAIRES + ['Parc']
+        )
+        return extrait.to_csv(sep=';', index=False)
@@ -0,0 +1,81 @@
+"""Essais de l'affectation de coût minimal (python -m unittest test_affectation)"""
+import itertools
+import unittest
+
+import numpy as np
+
+import affectation
+from affectation import INTERDIT, _hongrois, affecter_places, resoudre_affectation
+
+
+def cout_minimal(cout):
+    """Force brute: meilleur coût total en affectant chaque ligne (ou colonne, la plus petite dimension)"""
+    if cout.shape[0] > cout.shape[1]:
+        cout = cout.T
+    return min(sum(cout[i, j] for i, j in enumerate(colonnes))
+               for colonnes in itertools.permutations(range(cout.shape[1]), cout.shape[0]))
+
+
+class EssaisResolution(unittest.TestCase):
+
+    def matrices(self):
+        aleatoire = np.random.default_rng(7)
+        for _ in range(150):
+            lignes, colonnes = aleatoire.integers(1, 6, size=2)
+            cout = aleatoire.integers(0, 5, size=(lignes, colonnes)).astype(float)
+            cout *= aleatoire.choice([1.0, affectation.PALIER], size=cout.shape)
+            # Paires interdites, et parfois des lignes identiques (places d'un même cours)
+            cout[aleatoire.random(cout.shape) < 0.3] = INTERDIT
+            if aleatoire.random() < 0.3:
+                cout = np.repeat(cout[:1], lignes, axis=0)
+            yield cout
+
+    def verifier(self, resoudre):
+        for cout in self.matrices():
+            lignes, colonnes = resoudre(cout)
+            self.assertEqual(len(lignes), min(cout.shape))
+            self.assertEqual(len(set(lignes)), len(lignes))
+            self.assertEqual(len(set(colonnes)), len(colonnes))
+            self.assertTrue(np.all(np.diff(lignes) > 0), "lignes triées")
+            self.assertAlmostEqual(cout[lignes, colonnes].sum(), cout_minimal(cout), msg=str(cout))
+
+    def test_resolution_contre_force_brute(self):
+        self.verifier(resoudre_affectation)
+
+    def test_repli_numpy_contre_force_brute(self):
+        # Même vérification sans scipy, installé ou non
+        lsa = affectation.linear_sum_assignment
+        affectation.linear_sum_assignment = None
+        self.addCleanup(setattr, affectation, 'linear_sum_assignment', lsa)
+        self.verifier(resoudre_affectation)
+
+    def test_hongrois_carre_connu(self):
+        cout = np.array([[4.0, 1.0, 3.0], [2.0, 0.0, 5.0], [3.0, 2.0, 2.0]])
+        lignes, colonnes = _hongrois(cout)
+        self.assertEqual(cout[lignes, colonnes].sum(), 5.0)
+
+    def test_matrice_entierement_interdite(self):
+        lignes, colonnes = resoudre_affectation(np.full((2, 3), INTERDIT))
+        self.assertTrue((np.full((2, 3), INTERDIT)[lignes, colonnes] >= INTERDIT).all())
+
+
+class EssaisPlaces(unittest.TestCase):
+
+    def test_places_sans_chevauchement_ni_paire_interdite(self):
+        # 3 chevaux, 3 cours: 10-11 (2 places), 10:30-11:30 (1 place), 12-13 (2 places)
+        niveaux = np.array([[0, 0, 1], [1, 0, np.inf], [0, np.inf, 0]], dtype=float)
+        occupe = np.zeros((3, 3), dtype=bool)
+        occupe[2, 2] = True
+        debut, fin = np.array([600, 630, 720]), np.array([660, 690, 780])
+        selections = affecter_places(niveaux, np.zeros(3), None, occupe, debut, fin, np.ones(3), [2, 1, 2])
+        for c, chevaux in enumerate(selections):
+            self.assertEqual(len(chevaux), len(set(chevaux)))
+            for cheval in chevaux:
+                self.assertTrue(np.isfinite(niveaux[cheval, c]) and not occupe[cheval, c])
+        # Les cours 0 et 1 se chevauchent: aucun cheval dans les deux
+        self.assertFalse(set(selections[0]) & set(selections[1]))
+        self.assertEqual(sorted(map(len, selections)), [1, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
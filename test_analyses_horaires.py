@@ -0,0 +1,38 @@
+"""Essais des analyses de la semaine (python -m unittest test_analyses_horaires)"""
+import unittest
+from datetime import time
+
+from analyses_horaires import tableau_activites
+from constantes import JOURS_DEFAUT
+from moteur import calculer_duree, charger_donnees, generer_horaires
+from regles import charger_regles
+from test_faisabilite import contenus
+
+
+class EssaisAnalyses(unittest.TestCase):
+
+    def test_cours_sans_exigence_hors_remplissage(self):
+        donnees = charger_donnees(contenus(["Lundi;10:00;10:45;P;X;2", "Lundi;11:00;11:45;Q;;2"]))
+        analyses = generer_horaires(donnees, JOURS_DEFAUT, [], charger_regles())['analyses']
+        self.assertEqual(list(analyses['cours']['Nom']), ['P'])
+        self.assertEqual(analyses['cours']['Remplissage'].tolist(), [1.0])
+
+    def test_depassement_identique_au_rapport(self):
+        contenu = contenus(["Lundi;10:00;12:00;P;X;3", "Mardi;10:00;12:00;Q;X;3"])
+        contenu['chevaux'] = "Nom_Cheval;Max_heures_Travail\nA;3\nB;0\nC;10".encode('utf-8')
+        resultat = generer_horaires(charger_donnees(contenu), JOURS_DEFAUT, [], charger_regles())
+        charge = resultat['analyses']['charge']
+        self.assertEqual(charge['Dépassement'].tolist(), resultat['df_report']['Dépassement'].tolist())
+        self.assertEqual(charge['Dépassement'].tolist(), [1.0, 0.0, 0.0])
+
+        self.assertEqual(list(charge.columns), ['Cheval', 'Heures actives', 'Heures passives', 'Heures max', 'Dépassement'])
+
+    def test_duree_apres_minuit(self):
+        heures = [(time(23, 30), time(0, 30)), (time(22, 0), time(23, 15)), (time(9, 0), time(9, 0))]
+        schedule = {'A': {'Lundi': [{'type': 'Cours Passif', 'nom': 'Nuit', 'heure_debut': hd, 'heure_fin': hf} for hd, hf in heures]}}
+        self.assertEqual(tableau_activites(schedule)['Durée'].tolist(), [calculer_duree(hd, hf) for hd, hf in heures])
+        self.assertEqual(tableau_activites(schedule)['Durée'].tolist(), [1.0, 1.25, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Essais des masques de compétences (python -m unittest test_competences)"""
+import random
+import unittest
+
+import pandas as pd
+
+from moteur import (QUALIFICATIONS_VALIDES, charger_donnees, chevaux_eligibles, encoder_competences,
+                    lire_exigences, masque_exigences)
+
+
+def competences_aleatoires(nb_chevaux, nb_competences, graine=0):
+    """Chaque cheval reçoit une qualification tirée au hasard pour une partie des compétences"""
+    hasard = random.Random(graine)
+    chevaux = [f"Cheval{i}" for i in range(nb_chevaux)]
+    competences = [f"C{k}" for k in range(nb_competences)]
+    competences_dict = {
+        nom: {comp: hasard.choice(['Oui', 'Dépannage', 'Non']) for comp in competences if hasard.random() < 0.7}
+        for nom in chevaux
+    }
+    return chevaux, competences, competences_dict
+
+
+def eligibles_ligne_a_ligne(competences_dict, liste_chevaux, exigences):
+    """Référence sans masque: on relit les qualifications cheval par cheval"""
+    qualifies = [all(competences_dict[nom].get(comp) in QUALIFICATIONS_VALIDES for comp in exigences) for nom in liste_chevaux]
+    oui = [all(competences_dict[nom].get(comp) == 'Oui' for comp in exigences) for nom in liste_chevaux]
+    return qualifies, oui
+
+
+class EssaisCompetences(unittest.TestCase):
+
+    def verifier_contre_reference(self, nb_competences, type_attendu):
+        chevaux, competences, competences_dict = competences_aleatoires(40, nb_competences)
+        hasard = random.Random(1)
+        # Quelques exigences touchent les derniers bits, une compétence n'est tenue par personne
+        exigences = [tuple(hasard.sample(competences, hasard.randint(1, 3))) for _ in range(200)]
+        exigences += [(competences[-1],), (competences[0], competences[-1]), ('Inconnue',), ()]
+        bits, masques_oui, masques_qualif = encoder_competences(competences_dict, chevaux, exigences)
+        self.assertEqual(masques_oui.dtype, type_attendu)
+        self.assertEqual(masques_qualif.dtype, type_attendu)
+        donnees = {'masques_oui': masques_oui, 'masques_qualif': masques_qualif}
+        for exigence in exigences:
+            qualifies, oui = chevaux_eligibles(donnees, masque_exigences(bits, exigence))
+            self.assertEqual((list(qualifies), list(oui)), eligibles_ligne_a_ligne(competences_dict, chevaux, exigence), exigence)
+
+    def test_masques_int64(self):
+        self.verifier_contre_reference(20, 'int64')
+
+    def test_masques_object_au_dela_de_63_competences(self):
+        self.verifier_contre_reference(70, object)
+
+    def test_lire_exigences(self):
+        df = pd.DataFrame({
+            'Exigence_10': ['Z', None],
+            'Exigence': ['X', None],
+            'Exigence_2': ['Y', None],
+            'Exigence_1': ['X', None],
+        })
+        self.assertEqual(lire_exigences(df), [('X', 'Y', 'Z'), ()])
+
+    def test_charger_donnees_au_dela_de_63_competences(self):
+        chevaux, competences, competences_dict = competences_aleatoires(10, 70)
+        lignes = [f"{nom};{comp};{qualif}" for nom, comps in competences_dict.items() for comp, qualif in comps.items()]
+        exigences = [competences[0], competences[64], competences[69]]
+        contenus = {
+            'chevaux': ("Nom_Cheval;Max_heures_Travail\n" + "\n".join(f"{nom};10" for nom in chevaux)).encode('utf-8'),
+            'competences': ("Nom_Cheval;Competence;Qualification\n" + "\n".join(lignes)).encode('utf-8'),
+            'cours_manege': ("Jour;Heure_début;Heure_fin;Cours_nom;Exigence_1;Exigence_2;Exigence_3;Nombre_chevaux\n"
+                             f"Lundi;10:00;11:00;P;{';'.join(exigences)};2").encode('utf-8'),
+            'cours_autres': "Jour;Heure_début;Heure_fin;Coursautres_nom;Exigence;Nombre_chevaux\n".encode('utf-8'),
+            'amis': "Nom_Cheval;Amis\n".encode('utf-8'),
+        }
+        donnees = charger_donnees(contenus)
+        self.assertEqual(donnees['masques_qualif'].dtype, object)
+        cours = donnees['df_cours_manege'].iloc[0]
+        self.assertEqual(cours['Exigences'], tuple(exigences))
+        qualifies, oui = chevaux_eligibles(donnees, cours['Masque_exigences'])
+        self.assertEqual((list(qualifies), list(oui)),
+                         eligibles_ligne_a_ligne(donnees['competences_dict'], donnees['liste_chevaux'], exigences))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Essais de la comparaison de deux semaines (python -m unittest test_diff_horaires)"""
+import unittest
+from datetime import time
+
+from diff_horaires import (
+    calculer_empreintes, comparer_horaires, exporter_modifications_csv, rapport_modifications, resumer_modifications
+)
+
+JOURS = ['Lundi', 'Mardi', 'Mercredi']
+
+
+def activite(type_activite, nom, debut, fin, parc=None):
+    return {'type': type_activite, 'nom': nom, 'parc': parc,
+            'heure_debut': time(*map(int, debut.split(':'))), 'heure_fin': time(*map(int, fin.split(':')))}
+
+
+def semaine(schedule, avec_empreintes=True):
+    resultat = {'jours': JOURS, 'schedule': schedule}
+    if avec_empreintes:
+        resultat['empreintes'] = calculer_empreintes(schedule)
+    return resultat
+
+
+class EssaisDiff(unittest.TestCase):
+
+    def setUp(self):
+        dressage = activite('Cours Actif', 'Dressage', '10:00', '11:00')
+        liberte = activite('Mise en liberté', 'Sortie seul, Parc 1', '07:00', '08:00', 'Parc 1')
+        # Jours volontairement dans le désordre: l'ordre vient de la liste 'jours'
+        self.avant = semaine({
+            'Alto': {'Mercredi': [liberte], 'Lundi': [dressage, liberte], 'Mardi': [dressage]},
+            'Bijou': {'Mercredi': [dressage], 'Lundi': [liberte], 'Mardi': []},
+        })
+        self.apres = semaine({
+            'Alto': {
+                'Mercredi': [activite('Mise en liberté', 'Sortie seul, Parc 2', '13:00', '14:00', 'Parc 2')],
+                'Mardi': [],
+                'Lundi': [dressage, liberte],
+            },
+            'Bijou': {'Mercredi': [dressage], 'Mardi': [activite('Cours Passif', 'Attelage', '10:30', '11:30')], 'Lundi': [liberte]},
+        }, avec_empreintes=False)
+
+    def test_cheval_jour_inchange_absent(self):
+        modifications = comparer_horaires(self.avant, self.apres)
+        self.assertNotIn(('Alto', 'Lundi'), {(m['Cheval'], m['Jour']) for m in modifications})
+        self.assertFalse([m for m in modifications if m['Cheval'] == 'Bijou' and m['Jour'] != 'Mardi'])
+        self.assertEqual(comparer_horaires(self.avant, self.avant), [])
+        self.assertEqual(rapport_modifications([], JOURS), "Aucune modification des horaires.")
+
+    def test_ajout_retrait_deplacement_dans_l_ordre_des_jours(self):
+        modifications = comparer_horaires(self.avant, self.apres)
+        self.assertEqual(
+            [(m['Cheval'], m['Jour'], m['Changement'], m['Activité']) for m in modifications],
+            [('Alto', 'Mardi', 'Retirée', 'Dressage'),
+             ('Alto', 'Mercredi', 'Déplacée', 'Sortie seul, Parc 2'),
+             ('Bijou', 'Mardi', 'Ajoutée', 'Attelage')])
+        deplacement = modifications[1]
+        self.assertEqual((deplacement['Avant'], deplacement['Après']), ('07:00-08:00', '13:00-14:00'))
+        self.assertEqual((deplacement['Parc avant'], deplacement['Parc après']), ('Parc 1', 'Parc 2'))
+        self.assertEqual(resumer_modifications(modifications), {'Retirée': 1, 'Déplacée': 1, 'Ajoutée': 1})
+
+        rapport = rapport_modifications(list(reversed(modifications)), JOURS).split('\n')
+        self.assertEqual(rapport[2:], [
+            "Alto:",
+            "  - Mardi 10:00-11:00 Cours Actif: Dressage",
+            "  ~ Mercredi Mise en liberté: Sortie seul, Parc 2, 07:00-08:00 -> 13:00-14:00 (Parc 1 -> Parc 2)",
+            "Bijou:",
+            "  + Mardi 10:30-11:30 Cours Passif: Attelage",
+        ])
+
+        csv = exporter_modifications_csv(modifications).splitlines()
+        self.assertTrue(csv[0].startswith('Cheval;Jour;Changement'))
+        self.assertEqual([ligne.split(';')[1] for ligne in csv[1:]], ['Mardi', 'Mercredi', 'Mardi'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+"""Essais de la pré-vérification de faisabilité (python -m unittest test_faisabilite)"""
+import unittest
+
+from constantes import JOURS_DEFAUT
+from faisabilite import verifier_faisabilite
+from moteur import charger_donnees, generer_horaires
+from regles import charger_regles
+
+
+def contenus(cours_manege):
+    """Trois chevaux qualifiés en X, des cours de manège donnés en lignes CSV"""
+    chevaux = ['A', 'B', 'C']
+    return {
+        'chevaux': ("Nom_Cheval;Max_heures_Travail\n" + "\n".join(f"{nom};10" for nom in chevaux)).encode('utf-8'),
+        'competences': ("Nom_Cheval;Competence;Qualification\n" + "\n".join(f"{nom};X;Oui" for nom in chevaux)).encode('utf-8'),
+        'cours_manege': ("Jour;Heure_début;Heure_fin;Cours_nom;Exigence_1;Nombre_chevaux\n" + "\n".join(cours_manege)).encode('utf-8'),
+        'cours_autres': "Jour;Heure_début;Heure_fin;Coursautres_nom;Exigence;Nombre_chevaux\n".encode('utf-8'),
+        'amis': "Nom_Cheval;Amis\nA;B\nB;C\nC;A".encode('utf-8'),
+    }
+
+
+class EssaisFaisabilite(unittest.TestCase):
+
+    def verifier(self, cours_manege):
+        donnees = charger_donnees(contenus(cours_manege))
+        return donnees, verifier_faisabilite(donnees, JOURS_DEFAUT, [], charger_regles())
+
+    def test_cours_consecutifs_non_additionnes(self):
+        donnees, rapport = self.verifier(["Lundi;10:00;10:45;P;X;3", "Lundi;10:45;11:30;Q;X;3"])
+        self.assertEqual(rapport['alertes'], [])
+        self.assertTrue(rapport['creneaux'].empty)
+        # La génération pourvoit bien les deux cours
+        resultat = generer_horaires(donnees, JOURS_DEFAUT, [], charger_regles())
+        remplissage = resultat['analyses']['cours']
+        self.assertTrue((remplissage['Affectés'] == remplissage['Requis']).all())
+
+    def test_cours_chevauchants_signales(self):
+        _, rapport = self.verifier(["Lundi;10:00;10:45;P;X;3", "Lundi;10:30;11:30;Q;X;3"])
+        self.assertEqual(len(rapport['creneaux']), 1)
+        creneau = rapport['creneaux'].iloc[0]
+        self.assertEqual((creneau['Début'], creneau['Fin'], creneau['Demande'], creneau['Offre']), ('10:30', '10:45', 6, 3))
+        self.assertFalse(rapport['faisable'])
+
+
+if __name__ == '__main__':
+    unittest.main()
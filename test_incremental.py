@@ -0,0 +1,128 @@
+"""Essais de la replanification incrémentale (python -m unittest test_incremental)"""
+import copy
+import unittest
+
+from bench_horaires import generer_donnees_synthetiques
+from constantes import CHEVAUX_SOLOS_DEFAUT, JOURS_DEFAUT
+from incremental import deduire_changements, replanifier
+from moteur import charger_donnees, generer_horaires
+from regles import charger_regles
+
+
+def remplacer_lignes(contenu, remplacements=(), ajouts=(), retraits=()):
+    """Modifier un CSV (bytes) ligne par ligne: {ancienne: nouvelle}, lignes ajoutées, lignes retirées"""
+    lignes = contenu.decode('utf-8').split('\n')
+    lignes = [dict(remplacements).get(ligne, ligne) for ligne in lignes if ligne not in retraits]
+    return '\n'.join(lignes + list(ajouts)).encode('utf-8')
+
+
+def cours_du_jour(resultat, type_activite, jour):
+    """(nom, début, fin) -> chevaux affectés"""
+    cours = {}
+    for cheval, planning in resultat['schedule'].items():
+        for act in planning[jour]:
+            if act['type'] == type_activite:
+                cours.setdefault((act['nom'], act['heure_debut'], act['heure_fin']), []).append(cheval)
+    return cours
+
+
+class EssaisIncremental(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.contenus = generer_donnees_synthetiques(40)
+        cls.donnees = charger_donnees(cls.contenus)
+        cls.resultat = generer_horaires(cls.donnees, JOURS_DEFAUT, CHEVAUX_SOLOS_DEFAUT, charger_regles())
+        cls.copie = copy.deepcopy({cle: cls.resultat[cle] for cle in ['schedule', 'conflits', 'work_hours', 'empreintes']})
+
+    def tearDown(self):
+        # Le résultat d'origine est partagé dans le cache: jamais modifié
+        for cle, valeur in self.copie.items():
+            self.assertEqual(self.resultat[cle], valeur, cle)
+
+    def assertSansChevauchement(self, resultat):
+        for cheval, planning in resultat['schedule'].items():
+            for jour, activites in planning.items():
+                for a, b in zip(activites, activites[1:]):
+                    self.assertLessEqual(a['heure_fin'], b['heure_debut'], f"{cheval} {jour}: {a['nom']} / {b['nom']}")
+
+    def replanifier_contenus(self, **fichiers):
+        donnees = charger_donnees({**self.contenus, **fichiers})
+        changements = deduire_changements(self.donnees, donnees)
+        nouveau = replanifier(self.resultat, donnees, changements)
+        self.assertSansChevauchement(nouveau)
+        return changements, nouveau
+
+    def test_aucun_changement(self):
+        changements, nouveau = self.replanifier_contenus()
+        self.assertEqual(changements, [])
+        self.assertEqual(nouveau['schedule'], self.resultat['schedule'])
+
+    def test_maximum_vide_inchange(self):
+        ancienne = next(l for l in self.contenus['chevaux'].decode('utf-8').split('\n') if l.startswith('Cheval0;'))
+        chevaux = remplacer_lignes(self.contenus['chevaux'], remplacements={ancienne: 'Cheval0;'})
+        donnees = charger_donnees({**self.contenus, 'chevaux': chevaux})
+        self.assertEqual(deduire_changements(donnees, charger_donnees({**self.contenus, 'chevaux': chevaux})), [])
+
+    def test_cheval_boiteux(self):
+        jour = 'Lundi'
+        cheval = next(c for c, planning in self.resultat['schedule'].items()
+                      if any(act['type'] == 'Cours Actif' for act in planning[jour]))
+        avant = cours_du_jour(self.resultat, 'Cours Actif', jour)
+        nouveau = replanifier(self.resultat, self.donnees, [{'type': 'cheval_indisponible', 'cheval': cheval, 'jours': [jour]}])
+        self.assertSansChevauchement(nouveau)
+        self.assertFalse([act for act in nouveau['schedule'][cheval][jour] if act['type'] != 'Mise en liberté'])
+        # Ses cours sont repourvus par d'autres chevaux
+        apres = cours_du_jour(nouveau, 'Cours Actif', jour)
+        for cle, chevaux in avant.items():
+            self.assertEqual(len(apres[cle]), len(chevaux), cle)
+        # Les autres jours sont intacts; ce jour-là, seuls les chevaux replacés changent de mise en liberté
+        for c, planning in nouveau['schedule'].items():
+            for j in JOURS_DEFAUT:
+                if j != jour:
+                    self.assertEqual(planning[j], self.resultat['schedule'][c][j])
+        libertes = lambda res, c: [a for a in res['schedule'][c][jour] if a['type'] == 'Mise en liberté']
+        deplaces = [c for c in nouveau['schedule'] if libertes(nouveau, c) != libertes(self.resultat, c)]
+        self.assertLessEqual(len(deplaces), nouveau['replanification']['libertes'])
+        self.assertLess(nouveau['replanification']['libertes'], len(self.donnees['liste_chevaux']) // 2)
+        self.assertIn((cheval, jour), nouveau['indisponibles'])
+
+    def test_cours_ajoute_retire_modifie(self):
+        lignes = self.contenus['cours_manege'].decode('utf-8').split('\n')
+        modifie, retire = lignes[1], lignes[2]
+        champs = modifie.split(';')
+        nouveau_nombre = int(champs[-1]) - 1
+        changements, nouveau = self.replanifier_contenus(cours_manege=remplacer_lignes(
+            self.contenus['cours_manege'],
+            remplacements={modifie: ';'.join(champs[:-1] + [str(nouveau_nombre)])},
+            retraits=[retire],
+            ajouts=["Mardi;18:00;19:00;Cours Ajouté;Debutant;;2"]))
+        self.assertEqual(sorted(c['type'] for c in changements), ['cours_ajoute', 'cours_modifie', 'cours_retire'])
+        jour_modifie, nom_modifie = champs[0], champs[3]
+        jour_retire, nom_retire = retire.split(';')[0], retire.split(';')[3]
+        noms = lambda jour: {nom: len(chevaux) for (nom, _, _), chevaux in cours_du_jour(nouveau, 'Cours Actif', jour).items()}
+        self.assertEqual(noms('Mardi')['Cours Ajouté'], 2)
+        self.assertNotIn(nom_retire, noms(jour_retire))
+        self.assertEqual(noms(jour_modifie)[nom_modifie], nouveau_nombre)
+        # Stabilité: les chevaux du cours modifié sont repris
+        avant = {c for (nom, _, _), chevaux in cours_du_jour(self.resultat, 'Cours Actif', jour_modifie).items()
+                 if nom == nom_modifie for c in chevaux}
+        apres = {c for (nom, _, _), chevaux in cours_du_jour(nouveau, 'Cours Actif', jour_modifie).items()
+                 if nom == nom_modifie for c in chevaux}
+        self.assertLessEqual(apres, avant)
+
+    def test_maximum_modifie(self):
+        cheval = next(c for c, planning in self.resultat['schedule'].items()
+                      if any(act['type'] == 'Cours Actif' for acts in planning.values() for act in acts))
+        ancienne = next(l for l in self.contenus['chevaux'].decode('utf-8').split('\n') if l.startswith(cheval + ';'))
+        changements, nouveau = self.replanifier_contenus(
+            chevaux=remplacer_lignes(self.contenus['chevaux'], remplacements={ancienne: f"{cheval};0"}))
+        self.assertEqual(changements, [{'type': 'cheval_modifie', 'cheval': cheval}])
+        self.assertFalse([act for acts in nouveau['schedule'][cheval].values() for act in acts if act['type'] == 'Cours Actif'])
+        rapport = nouveau['df_report'].set_index('Nom du Cheval')
+        self.assertEqual(rapport.loc[cheval, 'Heures Actives'], 0)
+        self.assertEqual(rapport.loc[cheval, 'Heures Max'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
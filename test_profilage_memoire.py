@@ -0,0 +1,62 @@
+"""Essais du mode diagnostic partagé entre sessions (python -m unittest test_profilage_memoire)"""
+import tracemalloc
+import unittest
+
+from profilage_memoire import DUREE_INSCRIPTION_S, ProfileurMemoire, activer_tracage
+
+
+class EssaisTracage(unittest.TestCase):
+
+    def tearDown(self):
+        for session in ['a', 'b']:
+            activer_tracage(session, False, maintenant=0)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def test_session_sans_diagnostic_ne_coupe_pas_une_mesure(self):
+        activer_tracage('a', True)
+        profileur = ProfileurMemoire()
+        with profileur.etape("Génération"):
+            # Rerun d'une autre session, case décochée
+            activer_tracage('b', False)
+            donnees = [bytes(1000) for _ in range(100)]
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertEqual(len(profileur.etapes), 1)
+        self.assertGreater(profileur.etapes[0]['retenu_octets'], 0)
+        del donnees
+
+    def test_arret_avec_la_derniere_session(self):
+        activer_tracage('a', True)
+        activer_tracage('b', True)
+        activer_tracage('a', False)
+        self.assertTrue(tracemalloc.is_tracing())
+        activer_tracage('b', False)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_session_disparue_expire(self):
+        # Onglet fermé case cochée: la session ne rerun plus
+        activer_tracage('a', True, maintenant=0)
+        activer_tracage('b', False, maintenant=DUREE_INSCRIPTION_S / 2)
+        self.assertTrue(tracemalloc.is_tracing())
+        activer_tracage('b', False, maintenant=DUREE_INSCRIPTION_S + 1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_session_rafraichie_conservee(self):
+        activer_tracage('a', True, maintenant=0)
+        activer_tracage('b', True, maintenant=DUREE_INSCRIPTION_S)
+        activer_tracage('a', True, maintenant=DUREE_INSCRIPTION_S)
+        activer_tracage('b', False, maintenant=2 * DUREE_INSCRIPTION_S)
+        self.assertTrue(tracemalloc.is_tracing())
+        activer_tracage('b', False, maintenant=2 * DUREE_INSCRIPTION_S + 1)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_etape_omise_si_le_tracage_s_arrete(self):
+        tracemalloc.start()
+        profileur = ProfileurMemoire()
+        with profileur.etape("Génération"):
+            tracemalloc.stop()
+        self.assertEqual(profileur.etapes, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+"""Essais du chargement des règles de l'écurie (python -m unittest test_regles)"""
+import unittest
+
+from analyses_horaires import _capacite_parc
+from regles import ReglesCompilees, charger_regles
+
+
+class EssaisRegles(unittest.TestCase):
+
+    def test_capacite_propre_a_un_parc_etalons(self):
+        regles = charger_regles(contenu_csv="Regle;Valeur\ncapacites_parcs;E1:3\ncapacites_parcs;4:5\n".encode('utf-8'))
+        self.assertEqual(regles['capacites_parcs'], {'E1': 3, 4: 5})
+        compilees = ReglesCompilees(regles, [], [])
+        self.assertEqual(compilees.capacites_parcs_etalons, {1: 3, 2: regles['capacite_parc']})
+        self.assertEqual(compilees.capacites_parcs[4], 5)
+        self.assertEqual(_capacite_parc('Parc E1', regles), 3)
+        self.assertEqual(_capacite_parc('Parc 4', regles), 5)
+        # Un parc normal n'hérite pas de la capacité du parc d'étalons de même numéro
+        self.assertEqual(compilees.capacites_parcs[1], regles['capacite_parc'])
+
+    def test_plages_mal_formees_refusees_au_chargement(self):
+        for regle, valeur in [('plage_matin', '7h-12h'), ('plage_aprem', '15:30-13:00'),
+                              ('plage_matin', '07:00'), ('debut_apres_midi', 'midi')]:
+            with self.assertRaises(ValueError, msg=f"{regle}={valeur}"):
+                charger_regles(surcharges={regle: valeur})
+
+    def test_plage_valide(self):
+        self.assertEqual(charger_regles(surcharges={'plage_matin': ' 08:00-11:30 '})['plage_matin'], '08:00-11:30')
+
+
+if __name__ == '__main__':
+    unittest.main()
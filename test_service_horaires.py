@@ -0,0 +1,153 @@
+"""Essais du service HTTP avec le client local (python -m unittest test_service_horaires)"""
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+
+import service_horaires
+from bench_horaires import generer_donnees_synthetiques
+from service_horaires import ClientHoraires, creer_serveur
+
+
+def fichiers_synthetiques(nb_chevaux, graine=1):
+    return {nom: contenu.decode('utf-8') for nom, contenu in generer_donnees_synthetiques(nb_chevaux, graine).items()}
+
+
+class EssaisService(unittest.TestCase):
+
+    def demarrer(self, **options):
+        serveur = creer_serveur(port=0, journaliser=False, **options)
+        fil = threading.Thread(target=serveur.serve_forever, daemon=True)
+        fil.start()
+
+        def arreter():
+            serveur.shutdown()
+            serveur.server_close()
+            serveur.service.arreter()
+        self.addCleanup(arreter)
+        return serveur, ClientHoraires(f"http://127.0.0.1:{serveur.server_address[1]}", delai=60)
+
+    def bloquer_generations(self):
+        """Les générations attendent l'événement retourné: les requêtes restent en cours"""
+        liberation = threading.Event()
+        generer_horaires = service_horaires.generer_horaires
+
+        def generer_bloque(*args, **kwargs):
+            liberation.wait(30)
+            return generer_horaires(*args, **kwargs)
+        service_horaires.generer_horaires = generer_bloque
+        self.addCleanup(setattr, service_horaires, 'generer_horaires', generer_horaires)
+        self.addCleanup(liberation.set)
+        return liberation
+
+    def attendre_en_cours(self, client, nombre):
+        for _ in range(500):
+            if client.metriques()['en_cours'] >= nombre:
+                return
+            time.sleep(0.01)
+        self.fail("génération jamais démarrée")
+
+    def test_formats(self):
+        _, client = self.demarrer()
+        fichiers = fichiers_synthetiques(12)
+        reponse = client.horaires(fichiers)
+        self.assertEqual(set(reponse), {'cle', 'jours', 'horaires', 'charge', 'conflits'})
+        self.assertTrue(reponse['horaires'])
+        csv = client.horaires(fichiers, format='csv').decode('utf-8')
+        self.assertTrue(csv.startswith('Cheval;Jour;'))
+        self.assertTrue(client.horaires(fichiers, format='xlsx').startswith(b'PK'))
+        metriques = client.metriques()
+        self.assertEqual(metriques['generations'], 1)
+        self.assertEqual(metriques['depuis_cache'], 2)
+
+    def test_requetes_identiques_dedupliquees(self):
+        _, client = self.demarrer()
+        liberation = self.bloquer_generations()
+        fichiers = fichiers_synthetiques(12)
+        reponses = []
+        fils = [threading.Thread(target=lambda: reponses.append(client.horaires(fichiers))) for _ in range(2)]
+        fils[0].start()
+        self.attendre_en_cours(client, 1)
+        fils[1].start()
+        for _ in range(500):
+            if client.metriques()['dedupliquees']:
+                break
+            time.sleep(0.01)
+        liberation.set()
+        for fil in fils:
+            fil.join(30)
+        metriques = client.metriques()
+        self.assertEqual(metriques['generations'], 1)
+        self.assertEqual(metriques['dedupliquees'], 1)
+        self.assertEqual(reponses[0], reponses[1])
+
+    def test_file_pleine(self):
+        _, client = self.demarrer(nb_workers=1, taille_file=0)
+        liberation = self.bloquer_generations()
+        fil = threading.Thread(target=client.horaires, args=(fichiers_synthetiques(12),))
+        fil.start()
+        self.attendre_en_cours(client, 1)
+        with self.assertRaises(urllib.error.HTTPError) as erreur:
+            client.horaires(fichiers_synthetiques(12, graine=2))
+        self.assertEqual(erreur.exception.code, 503)
+        liberation.set()
+        fil.join(30)
+        self.assertEqual(client.metriques()['rejetees'], 1)
+
+    def test_requetes_invalides(self):
+        _, client = self.demarrer()
+        fichiers = fichiers_synthetiques(12)
+        invalides = [
+            ({**fichiers, 'chevaux': "Nom;Max_heures_Travail\nA;6"}, {}),    # colonne Nom_Cheval absente
+            (fichiers, {'chevaux_solos': 'Mykola'}),                        # une chaîne au lieu d'une liste
+            ({**fichiers, 'amis': 42}, {}),                                 # contenu de fichier non textuel
+            (fichiers, {'regles': ['nb_parcs', 3]}),                        # règles qui ne sont pas un objet
+            (fichiers, {'regles': {'plage_matin': '7h-12h'}}),              # plage mal formée
+        ]
+        for corps, options in invalides:
+            with self.assertRaises(urllib.error.HTTPError) as erreur:
+                client.horaires(corps, **options)
+            self.assertEqual(erreur.exception.code, 400)
+        with self.assertRaises(urllib.error.HTTPError) as erreur:
+            client._appeler('POST', '/horaires', [fichiers])
+        self.assertEqual(erreur.exception.code, 400)
+
+    def test_cheval_inconnu(self):
+        _, client = self.demarrer()
+        fichiers = fichiers_synthetiques(12)
+        fichiers['competences'] += "\nFantome;Galop;Oui"
+        with self.assertRaises(urllib.error.HTTPError) as erreur:
+            client.horaires(fichiers)
+        self.assertEqual(erreur.exception.code, 400)
+        message = json.loads(erreur.exception.read())['erreur']
+        self.assertIn("Cheval inconnu", message)
+        self.assertIn("Fantome", message)
+
+    def test_maximum_vide_en_null(self):
+        _, client = self.demarrer()
+        fichiers = fichiers_synthetiques(12)
+        fichiers['chevaux'] = fichiers['chevaux'].replace("\nBully;8\n", "\nBully;\n")
+        brut = client._appeler('POST', '/horaires', {'fichiers': fichiers, 'format': 'json'})
+        charge = {ligne['Nom du Cheval']: ligne for ligne in brut['charge']}
+        self.assertIsNone(charge['Bully']['Heures Max'])
+        # JSON strict: aucune constante NaN/Infinity dans la réponse
+        requete = urllib.request.Request(client.url + '/horaires', method='POST', headers={'Content-Type': 'application/json'},
+                                         data=json.dumps({'fichiers': fichiers}).encode('utf-8'))
+        with urllib.request.urlopen(requete, timeout=60) as reponse:
+            json.loads(reponse.read(), parse_constant=lambda constante: self.fail(f"{constante} dans le JSON"))
+
+    def test_faisabilite_puis_generation(self):
+        _, client = self.demarrer()
+        fichiers = fichiers_synthetiques(20)
+        self.assertTrue(client.faisabilite(fichiers)['faisable'])
+        client.horaires(fichiers, verifier_faisabilite=True)
+        metriques = client.metriques()
+        # Les fichiers ne sont analysés qu'une fois pour les trois calculs
+        self.assertEqual(metriques['cache_donnees']['entrees'], 1)
+        self.assertEqual(metriques['verifications'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Essais de l'historique SQLite (python -m unittest test_stockage_horaires)"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from constantes import JOURS_DEFAUT
+from moteur import charger_donnees, generer_horaires
+from regles import charger_regles
+from stockage_horaires import StockHoraires
+from test_faisabilite import contenus
+
+
+class EssaisStockage(unittest.TestCase):
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.chemin = os.path.join(dossier.name, 'historique.sqlite3')
+
+    def generer(self, chevaux):
+        fichiers = contenus(["Lundi;10:00;11:00;P;X;2"])
+        fichiers['chevaux'] = chevaux.encode('utf-8')
+        return generer_horaires(charger_donnees(fichiers), JOURS_DEFAUT, [], charger_regles())
+
+    def test_maximum_vide(self):
+        resultat = self.generer("Nom_Cheval;Max_heures_Travail\nA;10\nB;\nC;4")
+        stock = StockHoraires(self.chemin)
+        semaine_id = stock.enregistrer(resultat, 'cle')
+        charges = stock.charges(semaine_id).set_index('cheval')
+        self.assertTrue(charges['heures_max'].isna()['B'])
+        self.assertEqual(charges.loc['C', 'heures_max'], 4)
+        rapport, _ = stock.rapport_charge(semaine_id)
+        self.assertEqual(rapport['Dépassement'].tolist(), [0.0, 0.0, 0.0])
+
+    def test_cheval_declare_deux_fois(self):
+        resultat = self.generer("Nom_Cheval;Max_heures_Travail\nA;10\nB;10\nC;4\nA;6")
+        stock = StockHoraires(self.chemin)
+        semaine_id = stock.enregistrer(resultat, 'cle')
+        self.assertEqual(stock.chevaux(semaine_id), ['A', 'B', 'C'])
+
+    def test_ancienne_base_migree(self):
+        with sqlite3.connect(self.chemin) as connexion:
+            connexion.executescript("""
+                CREATE TABLE semaines (id INTEGER PRIMARY KEY, cle TEXT UNIQUE NOT NULL, libelle TEXT,
+                                       cree_le TEXT NOT NULL, jours TEXT NOT NULL);
+                CREATE TABLE charges (semaine_id INTEGER NOT NULL REFERENCES semaines(id) ON DELETE CASCADE,
+                                      ordre INTEGER NOT NULL, cheval TEXT NOT NULL, heures_actives REAL NOT NULL,
+                                      heures_passives REAL NOT NULL, heures_max REAL NOT NULL,
+                                      PRIMARY KEY (semaine_id, cheval));
+                INSERT INTO semaines VALUES (1, 'ancienne', 'Ancienne', '2024-01-01T00:00:00', '["Lundi"]');
+                INSERT INTO charges VALUES (1, 0, 'A', 2.0, 1.0, 6.0);
+            """)
+        connexion.close()
+        stock = StockHoraires(self.chemin)
+        self.assertEqual(stock.charges(1)['heures_max'].tolist(), [6.0])
+        semaine_id = stock.enregistrer(self.generer("Nom_Cheval;Max_heures_Travail\nA;10\nB;\nC;4"), 'cle')
+        self.assertEqual(len(stock.chevaux(semaine_id)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
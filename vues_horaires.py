@@ -0,0 +1,262 @@
+"""Rendu des vues de l'application (calendriers HTML, styles, faisabilité, analyses).
+
+Module importé une fois par processus: les fonctions ne sont plus redéfinies
+à chaque rerun du script Streamlit.
+"""
+import os
+from datetime import time
+from functools import lru_cache
+
+import streamlit as st
+
+# Feuille de styles servie par Streamlit (server.enableStaticServing, voir .streamlit/config.toml)
+CHEMIN_STYLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'horaires.css')
+
+
+@lru_cache(maxsize=1)
+def _lire_styles():
+    with open(CHEMIN_STYLES, encoding='utf-8') as fichier:
+        return fichier.read()
+
+
+@lru_cache(maxsize=1)
+def _version_styles():
+    return int(os.path.getmtime(CHEMIN_STYLES))
+
+
+def charger_styles():
+    """Lier la feuille de styles statique (mise en cache par le navigateur), ou l'insérer
+    en ligne si le service des fichiers statiques est désactivé"""
+    if st.get_option('server.enableStaticServing'):
+        st.markdown(f'<link rel="stylesheet" href="app/static/horaires.css?v={_version_styles()}">', unsafe_allow_html=True)
+    else:
+        st.markdown(f"<style>{_lire_styles()}</style>", unsafe_allow_html=True)
+
+
+# Fenêtres horaires utilisées pour paginer les calendriers (début inclus, fin exclue)
+FENETRES_HORAIRES = {
+    "Toute la journée": (None, None),
+    "Matin (avant 12h)": (None, time(12, 0)),
+    "Après-midi (12h-17h)": (time(12, 0), time(17, 0)),
+    "Soir (après 17h)": (time(17, 0), None),
+}
+
+PARCS_PAR_PAGE = 4
+
+def get_activity_style(activity_type):
+    """Retourner la classe CSS selon le type d'activité"""
+    styles = {
+        'Cours Actif': 'course-active',
+        'Cours Passif': 'course-passive',
+        'Mise en liberté': 'mise-liberte'
+    }
+    return styles.get(activity_type, '')
+
+def est_dans_fenetre(heure, fenetre):
+    """Vérifier si une heure de début tombe dans la fenêtre horaire"""
+    debut, fin = fenetre
+    return (debut is None or heure >= debut) and (fin is None or heure < fin)
+
+def filtrer_chevaux(nom_activite, chevaux, filtre):
+    """Garder les chevaux correspondant au filtre (tous si le nom de l'activité correspond)"""
+    if not filtre or filtre in nom_activite.lower():
+        return chevaux
+    return [cheval for cheval in chevaux if filtre in cheval.lower()]
+
+def lister_pages_parcs(schedule, jours_actifs):
+    """Découper les parcs utilisés en pages de PARCS_PAR_PAGE parcs"""
+    parcs = set()
+    for planning in schedule.values():
+        for jour in jours_actifs:
+            for activity in planning.get(jour, []):
+                if activity['type'] == 'Mise en liberté':
+                    parcs.add(activity.get('parc', 'Parc ?'))
+    parcs = sorted(parcs, key=lambda p: (len(p), p))
+    return [parcs[i:i + PARCS_PAR_PAGE] for i in range(0, len(parcs), PARCS_PAR_PAGE)]
+
+def create_weekly_schedule_html(schedule, type_activite, jours_actifs, fenetre=(None, None), filtre=""):
+    """Créer un emploi du temps hebdomadaire pour un type d'activité"""
+    filtre = filtre.strip().lower()
+    
+    # Collecter toutes les activités par jour et heure
+    weekly_data = {jour: {} for jour in jours_actifs}
+    for cheval, planning in schedule.items():
+        for jour in jours_actifs:
+            for activity in planning.get(jour, []):
+                if activity['type'] != type_activite or not est_dans_fenetre(activity['heure_debut'], fenetre):
+                    continue
+                time_key = f"{activity['heure_debut'].strftime('%H:%M')}-{activity['heure_fin'].strftime('%H:%M')}"
+                
+                # Pour les cours, grouper par nom normalisé si disponible
+                if type_activite == 'Cours Actif' and 'nom_norm' in activity:
+                    group_key = activity['nom_norm']
+                else:
+                    group_key = activity['nom']
+                
+                slot = weekly_data[jour].setdefault(time_key, {})
+                if group_key not in slot:
+                    slot[group_key] = {'nom': activity['nom'], 'chevaux': []}
+                slot[group_key]['chevaux'].append(cheval)
+    
+    # Appliquer le filtre cheval / cours
+    if filtre:
+        for jour_data in weekly_data.values():
+            for time_key in list(jour_data):
+                for group_key in list(jour_data[time_key]):
+                    data = jour_data[time_key][group_key]
+                    data['chevaux'] = filtrer_chevaux(data['nom'], data['chevaux'], filtre)
+                    if not data['chevaux']:
+                        del jour_data[time_key][group_key]
+                if not jour_data[time_key]:
+                    del jour_data[time_key]
+    
+    # Obtenir toutes les plages horaires uniques, triées par heure de début
+    all_time_slots = set()
+    for jour_data in weekly_data.values():
+        all_time_slots.update(jour_data.keys())
+    
+    if not all_time_slots:
+        return "<p>Aucune activité de ce type pour cette sélection.</p>"
+    
+    sorted_slots = sorted(all_time_slots, key=lambda x: x.split('-')[0])
+    style_class = get_activity_style(type_activite)
+    
+    # Créer le HTML (classes uniquement, pas de style en ligne)
+    html = ['<div class="calendar-container"><table class="calendar-table">']
+    html.append('<thead><tr><th class="time-header">Heures</th>')
+    html.extend(f'<th class="jour-header">{jour}</th>' for jour in jours_actifs)
+    html.append('</tr></thead><tbody>')
+    
+    for time_slot in sorted_slots:
+        html.append(f'<tr><td class="time-header">{time_slot}</td>')
+        for jour in jours_actifs:
+            activities_in_slot = weekly_data[jour].get(time_slot)
+            if not activities_in_slot:
+                html.append('<td></td>')
+                continue
+            html.append(f'<td class="course-block {style_class}">')
+            for data in activities_in_slot.values():
+                chevaux_sorted = sorted(data['chevaux'])
+                html.append(
+                    f'<div class="cal-entree"><strong>{data["nom"]}</strong>'
+                    f'<span class="cal-effectif">({len(chevaux_sorted)} chevaux)</span>'
+                    f'<small class="cal-chevaux">{", ".join(chevaux_sorted)}</small></div>'
+                )
+            html.append('</td>')
+        html.append('</tr>')
+    
+    html.append('</tbody></table></div>')
+    return ''.join(html)
+
+def create_park_weekly_schedule_html(schedule, jours_actifs, fenetre=(None, None), filtre="", parcs=None):
+    """Créer un emploi du temps hebdomadaire pour les parcs de mise en liberté"""
+    filtre = filtre.strip().lower()
+    
+    # Collecter les mises en liberté par jour, heure et parc
+    weekly_parks = {jour: {} for jour in jours_actifs}
+    for cheval, planning in schedule.items():
+        for jour in jours_actifs:
+            for activity in planning.get(jour, []):
+                if activity['type'] != 'Mise en liberté' or not est_dans_fenetre(activity['heure_debut'], fenetre):
+                    continue
+                park = activity.get('parc', 'Parc ?')
+                if parcs is not None and park not in parcs:
+                    continue
+                if filtre and filtre not in cheval.lower() and filtre not in park.lower():
+                    continue
+                time_key = activity['heure_debut'].strftime('%H:%M')
+                weekly_parks[jour].setdefault(time_key, {}).setdefault(park, []).append(cheval)
+    
+    all_times = set()
+    for jour_data in weekly_parks.values():
+        all_times.update(jour_data.keys())
+    
+    if not all_times:
+        return "<p>Aucune mise en liberté pour cette sélection.</p>"
+    
+    # Créer le HTML (classes uniquement, pas de style en ligne)
+    html = ['<div class="calendar-container"><table class="calendar-table">']
+    html.append('<thead><tr><th class="time-header">Heures</th>')
+    html.extend(f'<th class="jour-header">{jour}</th>' for jour in jours_actifs)
+    html.append('</tr></thead><tbody>')
+    
+    for time_slot in sorted(all_times):
+        html.append(f'<tr><td class="time-header">{time_slot}</td>')
+        for jour in jours_actifs:
+            parks_in_slot = weekly_parks[jour].get(time_slot)
+            if not parks_in_slot:
+                html.append('<td></td>')
+                continue
+            html.append('<td class="course-block mise-liberte">')
+            for park in sorted(parks_in_slot):
+                chevaux = sorted(parks_in_slot[park])
+                html.append(
+                    f'<div class="cal-entree"><strong class="parc-nom">{park}:</strong>'
+                    f'<small class="cal-chevaux">({len(chevaux)}) {", ".join(chevaux)}</small></div>'
+                )
+            html.append('</td>')
+        html.append('</tr>')
+    
+    html.append('</tbody></table></div>')
+    return ''.join(html)
+
+def afficher_faisabilite(rapport):
+    """Afficher le résultat de la pré-vérification de faisabilité"""
+    if rapport['faisable']:
+        st.success("✅ Pré-vérification: aucune impossibilité détectée.")
+    else:
+        st.error(f"❌ Pré-vérification: {len(rapport['alertes'])} impossibilité(s) détectée(s).")
+        for alerte in rapport['alertes']:
+            st.markdown(f'<div class="conflict-warning">⚠️ {alerte}</div>', unsafe_allow_html=True)
+    for avertissement in rapport['avertissements']:
+        st.warning(f"⚠️ {avertissement}")
+
+def formater_minutes(minutes):
+    return f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}"
+
+def afficher_analyses(analyses, jours_actifs):
+    """Afficher les indicateurs numériques de l'étape d'analyse (mise en forme ici seulement)"""
+    onglet_charge, onglet_sorties, onglet_parcs, onglet_cours = st.tabs(["🐴 Charge", "🏞️ Sorties", "🧱 Parcs", "📋 Cours"])
+    heures = st.column_config.NumberColumn(format="%.2f h")
+    with onglet_charge:
+        charge = analyses['charge']
+        st.caption(f"{int((charge['Dépassement'] > 0).sum())} cheval(aux) en dépassement · "
+                   f"{charge['Heures actives'].sum():.1f} h actives · {charge['Heures passives'].sum():.1f} h passives")
+        st.dataframe(
+            charge.sort_values('Dépassement', ascending=False),
+            use_container_width=True, hide_index=True,
+            column_config={'Heures actives': heures, 'Heures passives': heures, 'Heures max': heures, 'Dépassement': heures}
+        )
+    with onglet_sorties:
+        st.dataframe(analyses['sorties'], use_container_width=True)
+    with onglet_parcs:
+        parcs = analyses['parcs']
+        jours_parcs = [jour for jour in jours_actifs if jour in set(parcs['Jour'])]
+        if not jours_parcs:
+            st.caption("Aucune mise en liberté planifiée.")
+        else:
+            jour_parcs = st.selectbox("Jour:", jours_parcs, key="jour_occupation_parcs")
+            # Sans règles (semaine de l'historique), la capacité est inconnue: afficher le nombre de chevaux
+            avec_capacite = parcs['Capacité'].notna().any()
+            grille = parcs[parcs['Jour'] == jour_parcs].pivot(index='Parc', columns='Début', values='Occupation' if avec_capacite else 'Chevaux')
+            grille = grille.loc[sorted(grille.index, key=lambda p: (len(p), p))]
+            grille.columns = [formater_minutes(m) for m in grille.columns]
+            st.caption("Occupation des parcs par pas de temps (chevaux présents / capacité)" if avec_capacite
+                       else "Chevaux présents par parc et par pas de temps")
+            st.dataframe(grille.style.format("{:.0%}" if avec_capacite else "{:.0f}"), use_container_width=True)
+    with onglet_cours:
+        cours = analyses['cours']
+        if cours is None:
+            st.caption("Remplissage des cours indisponible pour une semaine de l'historique.")
+        else:
+            sous_remplis = cours[cours['Remplissage'] < 1]
+            st.caption(f"{len(sous_remplis)} cours sur {len(cours)} incomplets · remplissage moyen {cours['Remplissage'].mean():.0%}")
+            st.dataframe(
+                cours.sort_values('Remplissage').assign(
+                    Début=cours['Début'].map(formater_minutes),
+                    Fin=cours['Fin'].map(formater_minutes),
+                    Remplissage=cours['Remplissage'] * 100
+                ),
+                use_container_width=True, hide_index=True,
+                column_config={'Remplissage': st.column_config.ProgressColumn(format="%.0f%%", min_value=0, max_value=100)}
+            )